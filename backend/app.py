@@ -1,13 +1,25 @@
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_pymongo import PyMongo
 from config import config
+from auth import PasswordHasher, TokenCache
+from cache import ResponseCache
+from catalog import CardCatalog, intern_existing
+from database import client_options
+from serialization import MongoJSONProvider
+from indexes import ensure_indexes, index_report
+from metrics import CommandMetrics, Metrics, init_request_timing
+from stats import rebuild_stats
+from training import backfill_scenarios, backfill_signatures
+from tallies import TallyBuffer, reconcile_tallies
 import os
 
 from routes.auth_routes import init_routes as init_auth_routes
 from routes.decklist_routes import init_routes as init_decklist_routes
-from routes.scenario_routes import init_routes as init_scenario_routes
-from routes.vote_routes import init_routes as init_vote_routes
+from routes.scenario_routes import parse_utc, init_routes as init_scenario_routes
+from routes.vote_routes import VOTE_TALLY_PROJECTION, init_routes as init_vote_routes
+from routes.metrics_routes import init_routes as init_metrics_routes
 
 def create_app(config_name=None):
     app = Flask(__name__)
@@ -16,27 +28,116 @@ def create_app(config_name=None):
         config_name = os.getenv('FLASK_ENV', 'development')
 
     app.config.from_object(config[config_name])
+    app.json = MongoJSONProvider(app)
 
     CORS(app)
 
-    mongo = PyMongo(app)
+    mongo_options = client_options(app.config)
+    if app.config['METRICS_ENABLED']:
+        metrics = Metrics()
+        app.extensions['metrics'] = metrics
+        mongo_options['event_listeners'] = [CommandMetrics(metrics)]
+        init_request_timing(app, metrics)
+
+    mongo = PyMongo(app, **mongo_options)
+    app.extensions['mongo'] = mongo
+
+    if app.config['MONGO_ENSURE_INDEXES']:
+        ensure_indexes(mongo.db)
+
+    app.extensions['token_cache'] = TokenCache(
+        app.config['TOKEN_CACHE_SIZE'],
+        app.config['TOKEN_CACHE_TTL_SECONDS']
+    )
+
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['BCRYPT_LOG_ROUNDS'],
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_MAX_PENDING'],
+        app.config['PASSWORD_HASH_TIMEOUT_SECONDS']
+    )
+
+    cache = ResponseCache.from_config(app.config)
+    app.extensions['response_cache'] = cache
+
+    catalog = CardCatalog(mongo.db)
+    app.extensions['card_catalog'] = catalog
+
+    tallies = None
+    if app.config['VOTE_TALLY_MODE'] == 'buffered':
+        tallies = TallyBuffer(
+            mongo.db,
+            VOTE_TALLY_PROJECTION,
+            app.config['VOTE_FLUSH_INTERVAL_MS'],
+            app.config['VOTE_FLUSH_MAX_VOTES']
+        )
+        app.extensions['tally_buffer'] = tallies
+    elif app.config['VOTE_TALLY_MODE'] != 'direct':
+        raise ValueError(f"Unknown vote tally mode {app.config['VOTE_TALLY_MODE']!r}")
 
     auth_bp = init_auth_routes(mongo)
-    decklist_bp = init_decklist_routes(mongo)
-    scenario_bp = init_scenario_routes(mongo)
-    vote_bp = init_vote_routes(mongo)
+    decklist_bp = init_decklist_routes(mongo, cache, catalog)
+    scenario_bp = init_scenario_routes(mongo, cache, catalog)
+    vote_bp = init_vote_routes(mongo, tallies)
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(decklist_bp)
     app.register_blueprint(scenario_bp)
     app.register_blueprint(vote_bp)
 
+    # Outside debug mode /api/metrics is only served behind METRICS_TOKEN
+    if app.config['METRICS_ENABLED'] and (app.config['METRICS_TOKEN'] or app.debug):
+        app.register_blueprint(init_metrics_routes(metrics))
+
     @app.route('/api/health', methods=['GET'])
     def health():
         return {'status': 'healthy'}, 200
 
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Create any missing MongoDB indexes."""
+        for collection, names in ensure_indexes(mongo.db).items():
+            print(f'{collection}: {", ".join(names)}')
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recompute mulligan statistics from the scenario tallies."""
+        print(f'Counted {rebuild_stats(mongo.db)} scenarios')
+
+    @app.cli.command('intern-cards')
+    def intern_cards_command():
+        """Store card ids instead of names in existing decklists and scenarios."""
+        decklists, scenarios = intern_existing(catalog, mongo.db)
+        print(f'Rewrote {decklists} decklists and {scenarios} scenarios')
+        print(f'Counted {rebuild_stats(mongo.db)} scenarios for statistics')
+
+    @app.cli.command('backfill-scenarios')
+    def backfill_scenarios_command():
+        """Add random keys, formats and hand signatures to older scenarios."""
+        print(f'Updated {backfill_scenarios(mongo.db)} scenarios')
+        print(f'Signed {backfill_signatures(mongo.db, catalog)} scenario hands')
+
+    @app.cli.command('reconcile-tallies')
+    @click.option('--since', help='only scenarios with votes cast or changed since this ISO 8601 time')
+    def reconcile_tallies_command(since):
+        """Recompute scenario tallies and statistics from the votes."""
+        since = parse_utc(since) if since else None
+        print(f'Reconciled {reconcile_tallies(mongo.db, since)} scenarios')
+
+    @app.cli.command('index-report')
+    def index_report_command():
+        """Report missing, undeclared and unused MongoDB indexes."""
+        for collection, status in index_report(mongo.db).items():
+            for kind, entries in status.items():
+                for entry in entries:
+                    print(f'{collection}: {kind} {entry}')
+
     return app
 
 if __name__ == '__main__':
+    if os.getenv('FLASK_ENV') == 'production':
+        # Hand the process over to gunicorn so it receives the container's signals
+        os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'])
+
     app = create_app()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
@@ -1,17 +1,106 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
 import jwt
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
 from flask_bcrypt import Bcrypt
+from metrics import timed
 
 bcrypt = Bcrypt()
 
-def hash_password(password):
-    return bcrypt.generate_password_hash(password).decode('utf-8')
+def hash_password(password, rounds=None):
+    return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
 
 def check_password(password_hash, password):
     return bcrypt.check_password_hash(password_hash, password)
 
+def hash_rounds(password_hash):
+    """Return the bcrypt cost factor encoded in a hash ($2b$<rounds>$...)."""
+    return int(password_hash.split('$')[2])
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full or a job timed out."""
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so it neither holds the GIL nor a
+    request thread's CPU, with a bounded number of pending jobs.
+
+    With workers=0 hashing runs inline in the calling thread, which is
+    what tests and the development server use.
+    """
+
+    def __init__(self, rounds=12, workers=0, max_pending=16, timeout=10):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created lazily per process: a pool inherited through gunicorn's
+        # fork would have no live worker processes
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+
+        if not self.workers:
+            try:
+                with timed('bcrypt'):
+                    return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job itself ends, not until this request
+        # stops waiting, so max_pending bounds the pool even after timeouts
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            with timed('bcrypt'):
+                return future.result(self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Frees the slot now if the job never started
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        return self._run(check_password, password_hash, password)
+
+    def check_unknown(self, password):
+        """Spend a check()'s worth of bcrypt on a login for an unregistered
+        email, so response times do not reveal which emails are registered.
+        Always returns False.
+        """
+        dummy_hash = self._dummy_hash
+        if dummy_hash is None or self.needs_rehash(dummy_hash):
+            dummy_hash = self._dummy_hash = hash_password(secrets.token_hex(16), self.rounds)
+        self.check(dummy_hash, password)
+        return False
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
 def generate_token(user_id):
     payload = {
         'user_id': str(user_id),
@@ -20,15 +109,86 @@ def generate_token(user_id):
     }
     return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
+class TokenCache:
+    """Bounded cache of verified tokens, so repeat requests skip jwt.decode.
+
+    Entries are keyed by a SHA-256 digest of the token (the raw token is
+    never kept) and expire at the token's own exp or after ttl seconds,
+    whichever comes first.
+
+    Tokens cannot be revoked: like an uncached JWT, a token stays valid
+    until its exp, so the cache never accepts one jwt.decode would reject.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """Return the cached user_id for a token, or None on a miss."""
+        digest = self._digest(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, token, user_id, exp):
+        """Remember a verified token until min(exp, now + ttl)."""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[self._digest(token)] = (user_id, expires_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries)
+            }
+
 def decode_token(token):
+    token_cache = current_app.extensions.get('token_cache')
+
+    if token_cache is not None:
+        user_id = token_cache.get(token)
+        if user_id is not None:
+            return user_id
+
     try:
         payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        return payload['user_id']
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+    if token_cache is not None:
+        token_cache.put(token, payload['user_id'], payload['exp'])
+
+    return payload['user_id']
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -44,7 +204,8 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
 
-        user_id = decode_token(token)
+        with timed('jwt'):
+            user_id = decode_token(token)
         if not user_id:
             return jsonify({'message': 'Token is invalid or expired'}), 401
 
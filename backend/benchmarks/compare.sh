@@ -0,0 +1,16 @@
+#!/bin/sh
+# Compare the micro-benchmarks and the load test against the committed
+# baselines in benchmarks/baselines; exits non-zero on a regression.
+#   THRESHOLD  allowed relative regression in percent (default 15)
+set -e
+cd "$(dirname "$0")/.."
+THRESHOLD=${THRESHOLD:-15}
+
+pytest benchmarks --no-cov -p no:cacheprovider \
+    --benchmark-storage=benchmarks/baselines \
+    --benchmark-compare=0001 \
+    --benchmark-compare-fail=median:${THRESHOLD}%
+
+python -m benchmarks.load --duration 5 --concurrency 4 \
+    --compare benchmarks/baselines/load.json \
+    --threshold "$(python -c "print(${THRESHOLD} / 100)")"
@@ -0,0 +1,41 @@
+import os
+import pytest
+from auth import generate_token
+from benchmarks.harness import mongomock_app, sample_ids, seed_database
+
+# BENCH_SCALE picks the seeded dataset (see harness.SCALES)
+BENCH_SCALE = os.getenv('BENCH_SCALE', 'smoke')
+
+@pytest.fixture(scope='session')
+def app():
+    """Create one app on mongomock, seeded once for every benchmark."""
+    with mongomock_app() as app:
+        # The hasher was built from the config, so set its cost too; otherwise
+        # the first login would rehash the seeded cost-4 hashes at cost 12
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
+        app.extensions['password_hasher'].rounds = 4
+        seed_database(app.extensions['mongo'].db, BENCH_SCALE, rounds=4)
+        yield app
+
+@pytest.fixture(scope='session')
+def db(app):
+    return app.extensions['mongo'].db
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture(scope='session')
+def scenario_ids(db):
+    return sample_ids(db, 'scenarios', 100)
+
+@pytest.fixture(scope='session')
+def decklist_ids(db):
+    return sample_ids(db, 'decklists', 20)
+
+@pytest.fixture(scope='session')
+def auth_headers(app, db):
+    user = db.users.find_one({}, {'_id': 1})
+    with app.app_context():
+        token = generate_token(user['_id'])
+    return {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
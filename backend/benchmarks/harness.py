@@ -0,0 +1,140 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+from flask_pymongo import PyMongo
+from app import create_app
+from auth import hash_password
+from catalog import CardCatalog
+from deck import MAX_SEED, CompiledDeck
+from models import Decklist, Scenario, User, Vote
+from stats import BASIC_LANDS, count_lands
+
+# Dataset sizes by name; 'full' is the production-sized target and needs a
+# real mongod, the others fit in mongomock
+SCALES = {
+    'smoke': {'users': 50, 'decklists': 20, 'scenarios': 500, 'votes': 2000},
+    'medium': {'users': 1000, 'decklists': 1000, 'scenarios': 50000, 'votes': 250000},
+    'full': {'users': 100000, 'decklists': 10000, 'scenarios': 1000000, 'votes': 10000000},
+}
+
+BENCH_PASSWORD = 'benchmark'
+CARD_POOL_SIZE = 2000
+ARCHETYPES = ['Aggro', 'Midrange', 'Control', 'Combo', 'Tempo', 'Ramp']
+CHUNK_SIZE = 10000
+
+def bench_email(i):
+    return f'bench{i}@example.com'
+
+@contextmanager
+def mongomock_app(config_name='development'):
+    """Create the app on an in-memory mongomock database, as the tests do."""
+    import mongomock
+
+    client = mongomock.MongoClient()
+
+    def mock_init(self, app=None, *args, **kwargs):
+        self.db = client['bench_db']
+        self.cx = client
+
+    with mock.patch.object(PyMongo, '__init__', mock_init):
+        app = create_app(config_name)
+    app.config['TESTING'] = True
+
+    try:
+        yield app
+    finally:
+        client.drop_database('bench_db')
+
+def random_decklist(rng, pool):
+    """A 60-card decklist: 24 basic lands and 9 four-ofs from the pool."""
+    lands = rng.sample(sorted(BASIC_LANDS), 2)
+    spells = rng.sample(pool, 9)
+    return [{'name': name, 'quantity': 12} for name in lands] + \
+        [{'name': name, 'quantity': 4} for name in spells]
+
+def _insert(collection, documents):
+    for start in range(0, len(documents), CHUNK_SIZE):
+        collection.insert_many(documents[start:start + CHUNK_SIZE], ordered=False)
+
+def seed_database(db, scale='smoke', rounds=4, seed=0):
+    """Fill db with a reproducible dataset of the given scale.
+
+    Users all share BENCH_PASSWORD (hashed once with the given bcrypt cost)
+    and are named by bench_email. Scenario tallies agree with the votes.
+
+    Returns:
+        Dict of collection name to documents inserted
+    """
+    sizes = SCALES[scale] if isinstance(scale, str) else scale
+    rng = random.Random(seed)
+    catalog = CardCatalog(db)
+    pool = [f'Card {i:04d}' for i in range(CARD_POOL_SIZE)]
+    start = datetime.utcnow() - timedelta(days=365)
+
+    password_hash = hash_password(BENCH_PASSWORD, rounds)
+    users = []
+    for i in range(sizes['users']):
+        user = User(f'bench{i}', bench_email(i), password_hash)
+        user.created_at = start
+        users.append(user.to_bson())
+    _insert(db.users, users)
+
+    decklists = []
+    compiled = []
+    for i in range(sizes['decklists']):
+        cards = random_decklist(rng, pool)
+        decklist = Decklist(f'Deck {i}', 'Modern', cards, rng.choice(users)['_id'], rng.choice(ARCHETYPES))
+        decklist.created_at = start + timedelta(minutes=i)
+        decklists.append(dict(decklist.to_bson(), cards=catalog.encode_cards(cards)))
+        compiled.append((decklist._id, CompiledDeck(cards)))
+    _insert(db.decklists, decklists)
+
+    # Spread the votes evenly, each scenario voted on by distinct users
+    votes_per_scenario = min(sizes['votes'] // max(sizes['scenarios'], 1), sizes['users'])
+    scenario_count = vote_count = 0
+    for offset in range(0, sizes['scenarios'], CHUNK_SIZE):
+        scenarios, votes = [], []
+        for i in range(offset, min(offset + CHUNK_SIZE, sizes['scenarios'])):
+            decklist_id, deck = rng.choice(compiled)
+            hand_seed = rng.randrange(MAX_SEED)
+            hand = deck.draw(7, hand_seed)
+            scenario = Scenario(
+                decklist_id=decklist_id,
+                hand=hand,
+                on_play=rng.random() < 0.5,
+                opponent_archetype=rng.choice(ARCHETYPES),
+                game_number=rng.randint(1, 3),
+                user_id=rng.choice(users)['_id'],
+                mulligan_count=rng.choice([0, 0, 0, 1]),
+                hand_seed=hand_seed,
+                land_count=count_lands(hand, deck.lands),
+                format='Modern'
+            )
+            scenario.created_at = start + timedelta(seconds=30 * i)
+            scenario.random_key = rng.random()
+
+            for voter in rng.sample(users, votes_per_scenario):
+                vote = Vote(scenario._id, voter['_id'], rng.choice(['keep', 'mulligan']))
+                vote.created_at = scenario.created_at
+                votes.append(vote.to_bson())
+                setattr(scenario, f'{vote.decision}_votes', getattr(scenario, f'{vote.decision}_votes') + 1)
+
+            scenarios.append(dict(scenario.to_bson(), hand=catalog.encode_names(hand)))
+
+        _insert(db.scenarios, scenarios)
+        _insert(db.votes, votes)
+        scenario_count += len(scenarios)
+        vote_count += len(votes)
+
+    return {
+        'users': len(users),
+        'decklists': len(decklists),
+        'scenarios': scenario_count,
+        'votes': vote_count
+    }
+
+def sample_ids(db, collection, count, seed=0):
+    """Pick up to count random _ids from a collection for request targets."""
+    ids = [document['_id'] for document in db[collection].find({}, {'_id': 1}).limit(count * 10)]
+    return random.Random(seed).sample(ids, min(count, len(ids)))
@@ -0,0 +1,263 @@
+"""Load generator for the API hot paths.
+
+Runs each endpoint for a fixed duration from a pool of client threads and
+reports throughput and p50/p95/p99 latency. By default the app runs
+in-process on a seeded mongomock database; --mongo-uri points it at a local
+mongod and --url sends real HTTP to a running server instead.
+
+    python -m benchmarks.load --scale smoke --duration 5
+    python -m benchmarks.load --mongo-uri mongodb://localhost:27017/mtg_bench --seed --scale full
+    python -m benchmarks.load --mongo-uri mongodb://localhost:27017/mtg_bench --url http://localhost:5000
+    python -m benchmarks.load --save benchmarks/baselines/load.json
+    python -m benchmarks.load --compare benchmarks/baselines/load.json --threshold 0.15
+
+Exits with status 1 when --compare finds an endpoint whose p95 rose or whose
+throughput fell by more than the threshold.
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+ENDPOINTS = ['login', 'create_vote', 'get_scenarios', 'get_scenario', 'create_scenario']
+
+# Users logged in before the run; requests needing a token pick one at random
+TOKEN_USERS = 20
+
+class TestClientTransport:
+    """Sends requests through Flask's test client, one client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        response = self.local.client.open(path, method=method, data=body, headers=headers)
+        return response.status_code, response.get_data()
+
+class HTTPTransport:
+    """Sends requests over keep-alive HTTP connections, one per thread."""
+
+    def __init__(self, url):
+        self.url = urlsplit(url)
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=30)
+        connection = self.local.connection
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            del self.local.connection
+            return 599, b''
+
+class Workload:
+    """Builds a random request for each endpoint from the seeded ids."""
+
+    def __init__(self, transport, users, scenarios, decklists, password):
+        self.transport = transport
+        self.users = users
+        self.scenarios = scenarios
+        self.decklists = decklists
+        self.password = password
+        self.tokens = [self.login_token(email) for email in users[:TOKEN_USERS]]
+
+    def login_token(self, email):
+        status, body = self.login(email)
+        if status != 200:
+            raise RuntimeError(f'Could not log in as {email} ({status})')
+        return json.loads(body)['token']
+
+    def login(self, email=None):
+        body = json.dumps({'email': email or random.choice(self.users), 'password': self.password})
+        return self.transport.request('POST', '/api/auth/login', body, {'Content-Type': 'application/json'})
+
+    def auth_headers(self):
+        return {'Authorization': f'Bearer {random.choice(self.tokens)}', 'Content-Type': 'application/json'}
+
+    def create_vote(self):
+        body = json.dumps({
+            'scenario_id': str(random.choice(self.scenarios)['_id']),
+            'decision': random.choice(['keep', 'mulligan'])
+        })
+        return self.transport.request('POST', '/api/votes', body, self.auth_headers())
+
+    def get_scenarios(self):
+        # Half first pages (cacheable), half deep pages from a random cursor
+        if random.random() < 0.5:
+            return self.transport.request('GET', '/api/scenarios?cursor=&per_page=20')
+        scenario = random.choice(self.scenarios)
+        raw = f"{scenario['created_at'].isoformat()}|{scenario['_id']}"
+        cursor = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+        return self.transport.request('GET', f'/api/scenarios?cursor={cursor}&per_page=20')
+
+    def get_scenario(self):
+        scenario_id = random.choice(self.scenarios)['_id']
+        return self.transport.request('GET', f'/api/scenarios/{scenario_id}?include=decklist_summary')
+
+    def create_scenario(self):
+        body = json.dumps({
+            'decklist_id': str(random.choice(self.decklists)),
+            'opponent_archetype': 'Aggro',
+            'game_number': 1
+        })
+        return self.transport.request('POST', '/api/scenarios', body, self.auth_headers())
+
+def percentile(quantiles, p):
+    return quantiles[p - 1] if quantiles else 0.0
+
+def run_endpoint(call, duration, concurrency):
+    """Call one endpoint from concurrency threads for duration seconds.
+
+    Returns:
+        Dict with requests, errors, rps and p50/p95/p99 latency in ms
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local_latencies, local_errors = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status, _ = call()
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+    }
+
+def compare(results, baseline, threshold):
+    """Return a message per endpoint that regressed beyond threshold."""
+    regressions = []
+    for endpoint, result in results.items():
+        base = baseline.get(endpoint)
+        if not base:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{endpoint}: p95 {result['p95_ms']:.2f}ms vs baseline {base['p95_ms']:.2f}ms")
+        if result['rps'] < base['rps'] * (1 - threshold):
+            regressions.append(f"{endpoint}: {result['rps']:.1f} req/s vs baseline {base['rps']:.1f} req/s")
+    return regressions
+
+def print_report(results):
+    print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, result in results.items():
+        print(
+            f"{endpoint:<18}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+        )
+
+@contextmanager
+def target_app(mongo_uri):
+    """Yield (app, db) on mongomock, or on mongo_uri when given."""
+    if mongo_uri:
+        # config reads MONGO_URI when first imported
+        os.environ['MONGO_URI'] = mongo_uri
+        from app import create_app
+        app = create_app('development')
+        yield app, app.extensions['mongo'].db
+    else:
+        from benchmarks.harness import mongomock_app
+        with mongomock_app() as app:
+            yield app, app.extensions['mongo'].db
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', default='smoke', help='dataset size to seed (smoke, medium or full)')
+    parser.add_argument('--mongo-uri', help='use this mongod instead of mongomock')
+    parser.add_argument('--seed', action='store_true', help='seed the --mongo-uri database first (mongomock is always seeded)')
+    parser.add_argument('--url', help='send HTTP to this running server instead of calling the app in-process')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='comma-separated endpoints to run')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per endpoint')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads per endpoint')
+    parser.add_argument('--rounds', type=int, default=None, help='bcrypt cost for seeded users and in-process logins (default: the app setting; a --url server keeps its own)')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed relative regression (default 0.15)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    endpoints = [endpoint for endpoint in args.endpoints.split(',') if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        sys.exit(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+
+    from benchmarks.harness import BENCH_PASSWORD, seed_database
+
+    with target_app(args.mongo_uri) as (app, db):
+        # Check logins at the seeded cost; otherwise every user's first login
+        # would also rehash at the default cost and write the new hash
+        rounds = args.rounds or app.config['BCRYPT_LOG_ROUNDS']
+        app.config['BCRYPT_LOG_ROUNDS'] = rounds
+        app.extensions['password_hasher'].rounds = rounds
+
+        if args.seed or not args.mongo_uri:
+            counts = seed_database(db, args.scale, rounds=rounds)
+            print('Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+
+        users = [user['email'] for user in db.users.find({'email': {'$regex': '^bench'}}, {'email': 1}).limit(1000)]
+        scenarios = list(db.scenarios.find({}, {'created_at': 1}).limit(10000))
+        decklists = [decklist['_id'] for decklist in db.decklists.find({}, {'_id': 1}).limit(1000)]
+        if not users or not scenarios or not decklists:
+            sys.exit('The database has no benchmark data; run with --seed first')
+
+        transport = HTTPTransport(args.url) if args.url else TestClientTransport(app)
+        workload = Workload(transport, users, scenarios, decklists, BENCH_PASSWORD)
+
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint] = run_endpoint(getattr(workload, endpoint), args.duration, args.concurrency)
+
+    print_report(results)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
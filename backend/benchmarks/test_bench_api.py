@@ -0,0 +1,90 @@
+import pytest
+import json
+import random
+from deck import CompiledDeck, compile_decklist
+from routes.scenario_routes import generate_hand
+from benchmarks.harness import BENCH_PASSWORD, bench_email, random_decklist
+
+pytest.importorskip('pytest_benchmark')
+
+DECKLIST = random_decklist(random.Random(0), [f'Card {i:04d}' for i in range(100)])
+
+class TestDeckBenchmarks:
+    def test_generate_hand(self, benchmark):
+        """Benchmark drawing a hand from an uncompiled decklist."""
+        hand = benchmark(generate_hand, DECKLIST, 7)
+
+        assert len(hand) == 7
+
+    def test_compiled_draw(self, benchmark):
+        """Benchmark drawing a hand from a compiled decklist."""
+        compiled = CompiledDeck(DECKLIST)
+
+        hand = benchmark(compiled.draw, 7)
+
+        assert len(hand) == 7
+
+    def test_compile_decklist_cached(self, benchmark, db, app):
+        """Benchmark the cached compile path the scenario routes take."""
+        decklist = db.decklists.find_one()
+        decode = app.extensions['card_catalog'].decode_cards
+
+        compiled = benchmark(compile_decklist, decklist, decode)
+
+        assert compiled.size == 60
+
+class TestAPIBenchmarks:
+    def test_login(self, benchmark, client, app, db):
+        """Benchmark POST /api/auth/login (bcrypt at the seeded cost)."""
+        body = json.dumps({'email': bench_email(0), 'password': BENCH_PASSWORD})
+
+        response = benchmark(client.post, '/api/auth/login', data=body, content_type='application/json')
+
+        assert response.status_code == 200
+        assert not app.extensions['password_hasher'].needs_rehash(db.users.find_one({'email': bench_email(0)})['password_hash'])
+
+    def test_create_vote(self, benchmark, client, auth_headers, scenario_ids):
+        """Benchmark POST /api/votes, alternating decisions so tallies move."""
+        decisions = iter(['keep', 'mulligan'] * 1000000)
+
+        def vote():
+            body = json.dumps({'scenario_id': str(random.choice(scenario_ids)), 'decision': next(decisions)})
+            return client.post('/api/votes', data=body, headers=auth_headers)
+
+        response = benchmark(vote)
+
+        assert response.status_code in (200, 201)
+
+    def test_get_scenarios_first_page(self, benchmark, client):
+        """Benchmark the first page of GET /api/scenarios."""
+        response = benchmark(client.get, '/api/scenarios?cursor=&per_page=20')
+
+        assert response.status_code == 200
+
+    def test_get_scenarios_uncached(self, benchmark, client, app):
+        """Benchmark GET /api/scenarios with the response cache invalidated each time."""
+        cache = app.extensions['response_cache']
+
+        def get():
+            cache.invalidate('scenarios')
+            return client.get('/api/scenarios?cursor=&per_page=20')
+
+        response = benchmark(get)
+
+        assert response.status_code == 200
+
+    def test_get_scenario(self, benchmark, client, scenario_ids):
+        """Benchmark GET /api/scenarios/<id> with the decklist joined."""
+        response = benchmark(lambda: client.get(f'/api/scenarios/{random.choice(scenario_ids)}'))
+
+        assert response.status_code == 200
+
+    def test_create_scenario(self, benchmark, client, auth_headers, decklist_ids):
+        """Benchmark POST /api/scenarios."""
+        def create():
+            body = json.dumps({'decklist_id': str(random.choice(decklist_ids)), 'opponent_archetype': 'Aggro', 'game_number': 1})
+            return client.post('/api/scenarios', data=body, headers=auth_headers)
+
+        response = benchmark(create)
+
+        assert response.status_code == 201
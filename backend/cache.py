@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, request
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Counters live outside the LRU so eviction can never reset them
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+class RedisBackend:
+    """Store backed by a Redis-compatible server, shared across workers."""
+
+    def __init__(self, url, prefix='mtg:cache:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+class ResponseCache:
+    """Read-through cache for anonymous JSON GET responses.
+
+    Entries are keyed by namespace, generation, path and query string.
+    Invalidating a namespace bumps its generation, which orphans every
+    entry cached under the old one until it expires.
+
+    With the memory backend the generation is per process: an invalidation
+    reaches only the worker that made the write, and other workers keep
+    serving their entries for up to ttl seconds. The redis backend shares
+    generations, so every worker sees the write at once.
+    """
+
+    def __init__(self, backend=None, ttl=30, fresh_read_seconds=5):
+        self.backend = backend
+        self.ttl = ttl
+        self.fresh_read_seconds = fresh_read_seconds
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        name = config['CACHE_BACKEND']
+        if name == 'memory':
+            backend = MemoryBackend(config['CACHE_MAX_ENTRIES'])
+        elif name == 'redis':
+            backend = RedisBackend(config['CACHE_REDIS_URL'])
+        else:
+            backend = None
+        return cls(backend, config['CACHE_TTL_SECONDS'], config['CACHE_FRESH_READ_SECONDS'])
+
+    def _count(self, counters, namespace):
+        with self._lock:
+            counters[namespace] = counters.get(namespace, 0) + 1
+
+    def _generation(self, namespace):
+        generation = self.backend.get(f'gen:{namespace}')
+        return int(generation) if generation is not None else 0
+
+    def invalidate(self, namespace):
+        """Drop every cached response in a namespace."""
+        if self.backend is not None:
+            self.backend.incr(f'gen:{namespace}')
+            if self.fresh_read_seconds > 0:
+                self.backend.set(f'written:{namespace}', b'1', self.fresh_read_seconds)
+
+    def written_recently(self, namespace):
+        """Whether the namespace was invalidated in the last fresh_read_seconds.
+
+        A listing refilled from a lagging secondary in that window would
+        cache the state from before the write, so it should read the primary.
+        """
+        return self.backend is not None and self.backend.get(f'written:{namespace}') is not None
+
+    def stats(self):
+        """Return hit and miss counters per namespace."""
+        with self._lock:
+            return {
+                namespace: {
+                    'hits': self.hits.get(namespace, 0),
+                    'misses': self.misses.get(namespace, 0)
+                }
+                for namespace in set(self.hits) | set(self.misses)
+            }
+
+    def cached(self, namespace, bypass=None):
+        """Decorate a view so successful responses are served from the cache.
+
+        bypass, if given, is called per request; when it returns True the
+        view runs uncached (e.g. for responses specific to the caller).
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if self.backend is None or (bypass is not None and bypass()):
+                    return f(*args, **kwargs)
+
+                query = '&'.join(sorted(
+                    f'{name}={value}' for name, value in request.args.items(multi=True)
+                ))
+                key = f'{namespace}:{self._generation(namespace)}:{request.path}?{query}'
+
+                body = self.backend.get(key)
+                if body is not None:
+                    self._count(self.hits, namespace)
+                    response = Response(body, 200, mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count(self.misses, namespace)
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    self.backend.set(key, response.get_data(), self.ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return decorated
+        return decorator
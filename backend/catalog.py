@@ -0,0 +1,142 @@
+import logging
+import threading
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from stats import count_lands
+
+logger = logging.getLogger(__name__)
+
+class CardCatalog:
+    """Interns card names as compact integer ids.
+
+    Decklists and scenario hands store ids from the cards collection
+    instead of repeating full names. Lookups go through an in-process
+    cache in both directions; card names never change, so it is never
+    invalidated. Values that are already names (documents written before
+    interning) pass through decoding untouched.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._ids = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, documents):
+        with self._lock:
+            for document in documents:
+                self._ids[document['name']] = document['_id']
+                self._names[document['_id']] = document['name']
+
+    def _allocate(self, count):
+        counter = self.db.counters.find_one_and_update(
+            {'_id': 'cards'},
+            {'$inc': {'seq': count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return range(counter['seq'] - count + 1, counter['seq'] + 1)
+
+    def encode_names(self, names):
+        """Return the ids for card names, adding unknown names to the catalog."""
+        missing = {name for name in names if name not in self._ids}
+
+        if missing:
+            self._remember(self.db.cards.find({'name': {'$in': list(missing)}}))
+            missing = {name for name in missing if name not in self._ids}
+
+        if missing:
+            new_cards = [
+                {'_id': card_id, 'name': name}
+                for card_id, name in zip(self._allocate(len(missing)), sorted(missing))
+            ]
+            try:
+                self.db.cards.insert_many(new_cards, ordered=False)
+            except BulkWriteError:
+                # Another process interned some of these names first; the
+                # ids we reserved for them are simply never used
+                pass
+            self._remember(self.db.cards.find({'name': {'$in': list(missing)}}))
+
+        return [self._ids[name] for name in names]
+
+    def decode(self, values):
+        """Return card names for a list of ids (names pass through).
+
+        Ids this process has not seen yet, such as cards interned by another
+        worker, are read from the cards collection. An id that is missing
+        there too decodes to a placeholder instead of failing the request.
+        """
+        missing = {
+            value for value in values
+            if not isinstance(value, str) and value not in self._names
+        }
+        if missing:
+            self._remember(self.db.cards.find({'_id': {'$in': list(missing)}}))
+            unknown = missing - self._names.keys()
+            if unknown:
+                logger.warning('Card ids missing from the catalog: %s', sorted(unknown))
+
+        return [
+            value if isinstance(value, str) else self._names.get(value, f'Unknown card #{value}')
+            for value in values
+        ]
+
+    def encode_cards(self, cards):
+        """Replace each decklist card's name with its id."""
+        ids = self.encode_names([card['name'] for card in cards])
+        return [
+            dict({key: value for key, value in card.items() if key != 'name'}, id=card_id)
+            for card, card_id in zip(cards, ids)
+        ]
+
+    def decode_cards(self, cards):
+        """Inverse of encode_cards; cards that still carry a name are kept."""
+        names = self.decode([card.get('id', card.get('name')) for card in cards])
+        return [
+            dict({key: value for key, value in card.items() if key != 'id'}, name=name)
+            for card, name in zip(cards, names)
+        ]
+
+    def _prefetch(self, values):
+        self.decode([value for value in values if not isinstance(value, str)])
+
+    def decode_decklists(self, decklists):
+        """Decode the cards of several decklists in place with one catalog read."""
+        self._prefetch([card.get('id', card.get('name')) for decklist in decklists for card in decklist.get('cards', [])])
+        for decklist in decklists:
+            if 'cards' in decklist:
+                decklist['cards'] = self.decode_cards(decklist['cards'])
+        return decklists
+
+    def decode_scenarios(self, scenarios):
+        """Decode the hands of several scenarios in place with one catalog read."""
+        self._prefetch([card for scenario in scenarios for card in scenario.get('hand', [])])
+        for scenario in scenarios:
+            if 'hand' in scenario:
+                scenario['hand'] = self.decode(scenario['hand'])
+        return scenarios
+
+def intern_existing(catalog, db):
+    """Rewrite decklists and scenarios still storing card names to use ids.
+
+    Returns:
+        Tuple of (decklists, scenarios) rewritten
+    """
+    decklists = 0
+    for decklist in db.decklists.find({'cards.name': {'$exists': True}}, {'cards': 1}):
+        cards = catalog.encode_cards(catalog.decode_cards(decklist['cards']))
+        db.decklists.update_one({'_id': decklist['_id']}, {'$set': {'cards': cards}})
+        decklists += 1
+
+    scenarios = 0
+    for scenario in db.scenarios.find({'hand': {'$type': 'string'}}, {'hand': 1, 'land_count': 1}):
+        names = catalog.decode(scenario['hand'])
+        update = {'hand': catalog.encode_names(names)}
+        if scenario.get('land_count') is None:
+            # Lands are counted by name, so do it while the names are at hand
+            update['land_count'] = count_lands(names)
+        db.scenarios.update_one({'_id': scenario['_id']}, {'$set': update})
+        scenarios += 1
+
+    return decklists, scenarios
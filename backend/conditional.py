@@ -0,0 +1,64 @@
+import hashlib
+from functools import wraps
+from flask import current_app, request
+
+def document_etag(*parts):
+    """Build an ETag from the values that identify a document version."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def not_modified(etag, last_modified=None):
+    """Return True if the client already holds this version.
+
+    Lets a route answer 304 before serializing anything. If-None-Match wins
+    over If-Modified-Since when both are sent, as in RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+
+    return False
+
+def set_validators(response, etag, last_modified=None, max_age=0, private=False):
+    """Attach ETag, Last-Modified and Cache-Control to a response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(etag, last_modified=None, max_age=0, private=False):
+    """Build the 304 response for a version the client already holds."""
+    response = current_app.response_class(status=304)
+    return set_validators(response, etag, last_modified, max_age, private)
+
+def conditional(max_age=0, private=False):
+    """Decorate a GET view with validators and 304 handling.
+
+    Views that can version their document cheaply call not_modified and
+    set_validators themselves to skip serialization; for everything else
+    the ETag is a hash of the response body, which still saves the transfer.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            if response.get_etag()[0] is None:
+                response.add_etag()
+                set_validators(response, response.get_etag()[0], None, max_age, private)
+
+            return response.make_conditional(request)
+
+        return decorated
+    return decorator
@@ -3,10 +3,53 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://mongodb:27017/mtg_mulligan')
     JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))  # 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_TIMEOUT_SECONDS = int(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+    TOKEN_CACHE_TTL_SECONDS = int(os.getenv('TOKEN_CACHE_TTL_SECONDS', 300))
+    MONGO_ENSURE_INDEXES = os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true'
+    # MongoDB client; maxPoolSize is per process, so per gunicorn worker
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 30000))
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', 'zstd,zlib')
+    MONGO_LISTING_READ_PREFERENCE = os.getenv('MONGO_LISTING_READ_PREFERENCE', 'secondaryPreferred')
+    # memory caches per gunicorn worker: after a write, other workers serve
+    # their cached listings for up to CACHE_TTL_SECONDS. redis shares the
+    # cache, so an invalidation reaches every worker at once.
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('CACHE_REDIS_URL') else 'memory')  # memory, redis or none
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 30))
+    # Listing refills read the primary for this long after an invalidation,
+    # so a lagging secondary cannot cache the pre-write listing again
+    CACHE_FRESH_READ_SECONDS = int(os.getenv('CACHE_FRESH_READ_SECONDS', 5))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # direct: $inc scenario tallies on every vote; buffered: coalesce them
+    # in-process and flush every VOTE_FLUSH_INTERVAL_MS or VOTE_FLUSH_MAX_VOTES
+    VOTE_TALLY_MODE = os.getenv('VOTE_TALLY_MODE', 'direct')
+    VOTE_FLUSH_INTERVAL_MS = int(os.getenv('VOTE_FLUSH_INTERVAL_MS', 250))
+    VOTE_FLUSH_MAX_VOTES = int(os.getenv('VOTE_FLUSH_MAX_VOTES', 500))
+    # Server-Timing headers, MongoDB command counters and /api/metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # /api/metrics requires it as a bearer token, and X-Metrics-Token: <token>
+    # unlocks the per-phase Server-Timing breakdown. Outside debug mode
+    # /api/metrics is not served at all without it.
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -14,6 +57,29 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
 
+    # gunicorn settings, read by gunicorn.conf.py
+    WSGI_BIND = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+    WSGI_WORKER_CLASS = os.getenv('WSGI_WORKER_CLASS', 'gthread')  # gthread, gevent or sync
+    WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', 2 * available_cpus() + 1))
+    WSGI_THREADS = int(os.getenv('WSGI_THREADS', 8))  # per worker, gthread only
+    WSGI_WORKER_CONNECTIONS = int(os.getenv('WSGI_WORKER_CONNECTIONS', 100))  # per worker, gevent only
+    WSGI_KEEPALIVE = int(os.getenv('WSGI_KEEPALIVE', 5))
+    WSGI_TIMEOUT = int(os.getenv('WSGI_TIMEOUT', 30))
+    WSGI_GRACEFUL_TIMEOUT = int(os.getenv('WSGI_GRACEFUL_TIMEOUT', 30))
+    WSGI_MAX_REQUESTS = int(os.getenv('WSGI_MAX_REQUESTS', 1000))
+    WSGI_MAX_REQUESTS_JITTER = int(os.getenv('WSGI_MAX_REQUESTS_JITTER', 100))
+    WSGI_PRELOAD_APP = os.getenv('WSGI_PRELOAD_APP', 'true').lower() == 'true'
+
+    # bcrypt processes per gunicorn worker, sharing the container's CPUs
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, available_cpus() // WSGI_WORKERS)))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 4 * PASSWORD_HASH_WORKERS))
+
+    # One pooled connection per request a worker can serve concurrently
+    MONGO_MAX_POOL_SIZE = int(os.getenv(
+        'MONGO_MAX_POOL_SIZE',
+        WSGI_WORKER_CONNECTIONS if WSGI_WORKER_CLASS == 'gevent' else WSGI_THREADS
+    ))
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
@@ -0,0 +1,44 @@
+from flask import current_app
+from pymongo import ReadPreference
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST
+}
+
+def client_options(config):
+    """Build MongoClient keyword arguments from the app config.
+
+    Compressors whose Python module is missing (zstandard, python-snappy)
+    are skipped by the driver with a warning, so the list is safe to ship
+    everywhere.
+    """
+    if config['MONGO_LISTING_READ_PREFERENCE'] not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference {config['MONGO_LISTING_READ_PREFERENCE']!r}")
+
+    options = {
+        'maxPoolSize': config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': config['MONGO_MIN_POOL_SIZE'],
+        'maxIdleTimeMS': config['MONGO_MAX_IDLE_TIME_MS'],
+        'serverSelectionTimeoutMS': config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'connectTimeoutMS': config['MONGO_CONNECT_TIMEOUT_MS'],
+        'socketTimeoutMS': config['MONGO_SOCKET_TIMEOUT_MS']
+    }
+    if config['MONGO_COMPRESSORS']:
+        options['compressors'] = config['MONGO_COMPRESSORS']
+    return options
+
+def listing_collection(mongo, name, primary=False):
+    """Return a collection that reads with the listing read preference.
+
+    Anonymous listings tolerate replication lag (they are cached for
+    seconds anyway), so they can be served by the nearest secondary.
+    primary=True reads the primary instead, for refills right after a write.
+    """
+    if primary:
+        return mongo.db[name].with_options(read_preference=ReadPreference.PRIMARY)
+    preference = READ_PREFERENCES[current_app.config['MONGO_LISTING_READ_PREFERENCE']]
+    return mongo.db[name].with_options(read_preference=preference)
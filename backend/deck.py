@@ -0,0 +1,107 @@
+import hashlib
+import random
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from stats import is_land
+
+class CompiledDeck:
+    """A decklist reduced to card names and cumulative counts.
+
+    Position i of the virtual, fully expanded deck belongs to the first card
+    whose cumulative count exceeds i, so hands can be drawn by sampling
+    positions without ever building the expanded list.
+    """
+
+    def __init__(self, cards):
+        cards = [card for card in cards if card['quantity'] > 0]
+        self.names = [card['name'] for card in cards]
+        self.cumulative = list(accumulate(card['quantity'] for card in cards))
+        self.size = self.cumulative[-1] if self.cumulative else 0
+        self.lands = {card['name'] for card in cards if is_land(card)}
+
+    def card_at(self, position):
+        return self.names[bisect_right(self.cumulative, position)]
+
+    def draw(self, num_cards, seed=None):
+        """Draw a hand without replacement.
+
+        Args:
+            num_cards: Number of cards to draw, capped at the deck size
+            seed: Optional seed; the same seed and decklist always give the same hand
+
+        Returns:
+            List of card names
+        """
+        rng = random.Random(seed) if seed is not None else random
+        positions = rng.sample(range(self.size), min(num_cards, self.size))
+        return [self.card_at(position) for position in positions]
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 256
+
+def compile_decklist(decklist, decode=None):
+    """Return the CompiledDeck for a decklist document, cached per _id.
+
+    The cache key includes updated_at, so a decklist written with a new
+    updated_at is recompiled; invalidate_decklist drops an entry explicitly.
+    decode, if given, turns the stored cards into {name, quantity} cards
+    and only runs on a cache miss.
+    """
+    key = (str(decklist['_id']), decklist.get('updated_at'))
+
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    cards = decode(decklist['cards']) if decode else decklist['cards']
+    compiled = CompiledDeck(cards)
+
+    with _cache_lock:
+        _cache[key] = compiled
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return compiled
+
+def invalidate_decklist(decklist_id):
+    """Drop every cached compilation of a decklist."""
+    decklist_id = str(decklist_id)
+    with _cache_lock:
+        for key in [key for key in _cache if key[0] == decklist_id]:
+            del _cache[key]
+
+# Seeds travel through JSON to the browser, so keep them exact as doubles
+MAX_SEED = 2 ** 53
+
+def new_seed():
+    """Return a fresh seed for a reproducible hand."""
+    return random.randrange(MAX_SEED)
+
+def is_valid_seed(seed):
+    return isinstance(seed, int) and not isinstance(seed, bool) and 0 <= seed < MAX_SEED
+
+def hand_signature(hand, on_play, num_cards, game_number, opponent_archetype):
+    """Identify a hand and its game context regardless of card order.
+
+    Scenarios with the same seven cards as a multiset, play/draw, final
+    hand size, game number and opponent archetype (case-insensitive) get
+    the same signature, whichever decklist they were drawn from.
+
+    Args:
+        hand: List of card names
+
+    Returns:
+        Hex digest
+    """
+    context = [
+        str(num_cards),
+        str(bool(on_play)),
+        str(game_number),
+        (opponent_archetype or '').strip().casefold()
+    ]
+    return hashlib.sha1('\x1f'.join(context + sorted(hand)).encode('utf-8')).hexdigest()
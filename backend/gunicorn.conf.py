@@ -0,0 +1,25 @@
+# gunicorn settings for FLASK_ENV=production, taken from the active config.
+# Run with: gunicorn --config gunicorn.conf.py wsgi:app
+from config import ProductionConfig as settings
+
+bind = settings.WSGI_BIND
+worker_class = settings.WSGI_WORKER_CLASS
+workers = settings.WSGI_WORKERS
+threads = settings.WSGI_THREADS
+worker_connections = settings.WSGI_WORKER_CONNECTIONS
+keepalive = settings.WSGI_KEEPALIVE
+timeout = settings.WSGI_TIMEOUT
+graceful_timeout = settings.WSGI_GRACEFUL_TIMEOUT
+max_requests = settings.WSGI_MAX_REQUESTS
+max_requests_jitter = settings.WSGI_MAX_REQUESTS_JITTER
+preload_app = settings.WSGI_PRELOAD_APP
+
+accesslog = '-'
+errorlog = '-'
+
+def pre_fork(server, worker):
+    # create_app talks to MongoDB (index bootstrap) in the master when the
+    # app is preloaded; MongoClient is not fork-safe, so close it and let
+    # each worker reconnect lazily on first use
+    if preload_app:
+        server.app.wsgi().extensions['mongo'].cx.close()
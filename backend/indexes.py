@@ -0,0 +1,111 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# Indexes each blueprint's queries rely on, keyed by collection.
+# Every entry is (keys, options) as accepted by create_index.
+INDEXES = {
+    'users': [
+        # auth_routes: register/login look users up by email and username
+        ([('email', ASCENDING)], {'unique': True}),
+        ([('username', ASCENDING)], {'unique': True}),
+    ],
+    'cards': [
+        # catalog.CardCatalog: name -> id lookups when interning
+        ([('name', ASCENDING)], {'unique': True}),
+    ],
+    'decklists': [
+        # decklist_routes.get_decklists: public listing, newest first
+        ([('is_public', ASCENDING), ('created_at', DESCENDING)], {}),
+        # decklist_routes.get_my_decklists: a user's decklists, newest first
+        ([('user_id', ASCENDING), ('created_at', DESCENDING)], {}),
+    ],
+    'scenarios': [
+        # scenario_routes.get_scenarios: listing, newest first
+        ([('created_at', DESCENDING), ('_id', DESCENDING)], {}),
+        # training.next_unvoted: random walk, unfiltered or within one
+        # decklist, format or hand size, each as a range scan on random_key
+        ([('random_key', ASCENDING)], {}),
+        ([('decklist_id', ASCENDING), ('random_key', ASCENDING)], {}),
+        ([('format', ASCENDING), ('random_key', ASCENDING)], {}),
+        ([('num_cards', ASCENDING), ('random_key', ASCENDING)], {}),
+        # scenario_routes: consensus across equivalent hands, and reuse
+        # of an equivalent scenario from the same decklist
+        ([('hand_signature', ASCENDING), ('decklist_id', ASCENDING)], {}),
+    ],
+    'mulligan_stats': [
+        # stats.record_vote upserts, decklist_routes.get_decklist_stats reads by decklist
+        ([
+            ('decklist_id', ASCENDING), ('scope', ASCENDING), ('card', ASCENDING),
+            ('num_cards', ASCENDING), ('on_play', ASCENDING), ('game_number', ASCENDING),
+            ('opponent_archetype', ASCENDING), ('land_count', ASCENDING)
+        ], {'unique': True}),
+    ],
+    'votes': [
+        # vote_routes: one vote per user per scenario
+        ([('scenario_id', ASCENDING), ('user_id', ASCENDING)], {'unique': True}),
+        # vote_routes.user_votes: a user's votes on a page of scenarios ($in)
+        ([('user_id', ASCENDING), ('scenario_id', ASCENDING)], {}),
+    ],
+}
+
+def _key(keys):
+    return tuple((field, direction) for field, direction in keys)
+
+def ensure_indexes(db):
+    """Create every declared index that does not exist yet.
+
+    create_index is a no-op for an index that already exists with the same
+    keys and options, so this is safe to run on every start.
+
+    Args:
+        db: PyMongo database
+
+    Returns:
+        Dict of collection name to list of index names ensured
+    """
+    ensured = {}
+    for collection, indexes in INDEXES.items():
+        ensured[collection] = [
+            db[collection].create_index(keys, **options)
+            for keys, options in indexes
+        ]
+    return ensured
+
+def index_usage(db, collection):
+    """Return access counts per index name, or None if $indexStats is unavailable."""
+    try:
+        stats = db[collection].aggregate([{'$indexStats': {}}])
+        return {stat['name']: stat['accesses']['ops'] for stat in stats}
+    except (OperationFailure, NotImplementedError):
+        return None
+
+def index_report(db):
+    """Compare the declared indexes with what exists in the database.
+
+    Args:
+        db: PyMongo database
+
+    Returns:
+        Dict of collection name to {'missing', 'undeclared', 'unused'} where
+        missing lists declared keys with no index, undeclared lists index
+        names nobody declared, and unused lists index names with zero
+        recorded accesses (empty when the server cannot report usage)
+    """
+    report = {}
+    for collection, indexes in INDEXES.items():
+        existing = {
+            name: _key(info['key'])
+            for name, info in db[collection].index_information().items()
+        }
+        declared = {_key(keys) for keys, _ in indexes}
+        usage = index_usage(db, collection) or {}
+
+        report[collection] = {
+            'missing': [list(key) for key in declared if key not in existing.values()],
+            'undeclared': [
+                name for name, key in existing.items()
+                if name != '_id_' and key not in declared
+            ],
+            'unused': [name for name, ops in usage.items() if name != '_id_' and ops == 0],
+        }
+    return report
@@ -0,0 +1,217 @@
+import hmac
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request
+from pymongo import monitoring
+
+# Histogram upper bounds in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_timings', default=None)
+
+class RequestTimings:
+    """Where the time of one request went, by phase.
+
+    Phases are filled in by timed() blocks (jwt, bcrypt, serialize) and by
+    CommandMetrics for MongoDB, which also counts the commands issued.
+    """
+    __slots__ = ('endpoint', 'started', 'phases', 'commands')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.commands = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self, total, detail=True):
+        """Format the phases as a Server-Timing header value (durations in ms).
+
+        With detail=False only the total is given.
+        """
+        entries = [f'app;dur={total * 1000:.2f}']
+        if not detail:
+            return entries[0]
+        for phase, seconds in self.phases.items():
+            entry = f'{phase};dur={seconds * 1000:.2f}'
+            if phase == 'mongo':
+                entry += f';desc="{self.commands} commands"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to a phase of the current request."""
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(phase, time.perf_counter() - started)
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+class Metrics:
+    """In-process request and MongoDB metrics in Prometheus text format.
+
+    Each gunicorn worker keeps its own registry, so a scrape reflects the
+    worker that answered it.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = defaultdict(lambda: [[0] * len(self.buckets), 0.0, 0])
+        self._requests = defaultdict(int)
+        self._commands = defaultdict(int)
+        self._command_seconds = defaultdict(float)
+        self._command_failures = defaultdict(int)
+
+    def observe_request(self, blueprint, endpoint, method, status, seconds):
+        with self._lock:
+            histogram = self._latency[blueprint]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            self._requests[(endpoint, method, status)] += 1
+
+    def observe_command(self, endpoint, command, seconds, failed=False):
+        with self._lock:
+            self._commands[(endpoint, command)] += 1
+            self._command_seconds[(endpoint, command)] += seconds
+            if failed:
+                self._command_failures[command] += 1
+
+    def render(self, response_cache=None, token_cache=None):
+        """Return the exposition text, with cache counters when given."""
+        lines = []
+
+        with self._lock:
+            lines.append('# HELP http_request_duration_seconds Request latency by blueprint')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for blueprint, (counts, total, count) in sorted(self._latency.items()):
+                for bound, bucket in zip(self.buckets, counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{_labels(blueprint=blueprint, le=bound)}}} {bucket}')
+                lines.append(f'http_request_duration_seconds_bucket{{{_labels(blueprint=blueprint, le="+Inf")}}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{{_labels(blueprint=blueprint)}}} {total}')
+                lines.append(f'http_request_duration_seconds_count{{{_labels(blueprint=blueprint)}}} {count}')
+
+            lines.append('# HELP http_requests_total Requests by endpoint, method and status')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+
+            lines.append('# HELP mongo_commands_total MongoDB commands by the endpoint that issued them')
+            lines.append('# TYPE mongo_commands_total counter')
+            for (endpoint, command), count in sorted(self._commands.items()):
+                lines.append(f'mongo_commands_total{{{_labels(endpoint=endpoint, command=command)}}} {count}')
+
+            lines.append('# HELP mongo_command_duration_seconds_total Time spent in MongoDB commands')
+            lines.append('# TYPE mongo_command_duration_seconds_total counter')
+            for (endpoint, command), seconds in sorted(self._command_seconds.items()):
+                lines.append(f'mongo_command_duration_seconds_total{{{_labels(endpoint=endpoint, command=command)}}} {seconds}')
+
+            lines.append('# HELP mongo_command_failures_total Failed MongoDB commands')
+            lines.append('# TYPE mongo_command_failures_total counter')
+            for command, count in sorted(self._command_failures.items()):
+                lines.append(f'mongo_command_failures_total{{{_labels(command=command)}}} {count}')
+
+        if response_cache is not None:
+            stats = sorted(response_cache.stats().items())
+            lines.append('# HELP response_cache_hits_total Response cache hits by namespace')
+            lines.append('# TYPE response_cache_hits_total counter')
+            lines.extend(f'response_cache_hits_total{{{_labels(namespace=namespace)}}} {counts["hits"]}' for namespace, counts in stats)
+            lines.append('# HELP response_cache_misses_total Response cache misses by namespace')
+            lines.append('# TYPE response_cache_misses_total counter')
+            lines.extend(f'response_cache_misses_total{{{_labels(namespace=namespace)}}} {counts["misses"]}' for namespace, counts in stats)
+
+        if token_cache is not None:
+            stats = token_cache.stats()
+            lines.append('# HELP token_cache_hits_total Verified JWT cache hits')
+            lines.append('# TYPE token_cache_hits_total counter')
+            lines.append(f'token_cache_hits_total {stats["hits"]}')
+            lines.append('# HELP token_cache_misses_total Verified JWT cache misses')
+            lines.append('# TYPE token_cache_misses_total counter')
+            lines.append(f'token_cache_misses_total {stats["misses"]}')
+            lines.append('# HELP token_cache_size Tokens held in the verified JWT cache')
+            lines.append('# TYPE token_cache_size gauge')
+            lines.append(f'token_cache_size {stats["size"]}')
+
+        return '\n'.join(lines) + '\n'
+
+class CommandMetrics(monitoring.CommandListener):
+    """pymongo listener that charges each command to the current request.
+
+    Listeners run synchronously in the thread that issued the command, so
+    the request's context is the one that is active.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def _record(self, event, failed=False):
+        seconds = event.duration_micros / 1e6
+        timings = _current.get()
+        endpoint = 'none'
+        if timings is not None:
+            timings.add('mongo', seconds)
+            timings.commands += 1
+            endpoint = timings.endpoint
+        self.metrics.observe_command(endpoint, event.command_name, seconds, failed)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+def init_request_timing(app, metrics):
+    """Time every request, emit Server-Timing and feed the metrics registry.
+
+    The per-phase breakdown is only sent in debug mode or to callers that
+    send METRICS_TOKEN in an X-Metrics-Token header. Everyone else gets the
+    total only, since phases such as bcrypt reveal what a request did.
+    """
+
+    def detailed():
+        token = app.config['METRICS_TOKEN']
+        if app.debug:
+            return True
+        return bool(token) and hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token)
+
+    @app.before_request
+    def start_timer():
+        _current.set(RequestTimings(request.endpoint or 'none'))
+
+    @app.after_request
+    def stop_timer(response):
+        timings = _current.get()
+        if timings is None:
+            return response
+
+        total = time.perf_counter() - timings.started
+        response.headers['Server-Timing'] = timings.server_timing(total, detailed())
+        metrics.observe_request(
+            request.blueprint or 'none',
+            timings.endpoint,
+            request.method,
+            response.status_code,
+            total
+        )
+        return response
+
+    @app.teardown_request
+    def reset_timer(exc):
+        _current.set(None)
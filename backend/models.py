@@ -1,7 +1,70 @@
+import random
 from datetime import datetime
+from operator import attrgetter
 from bson import ObjectId
+from deck import hand_signature
+
+class Model:
+    """Base class for the slotted document models.
+
+    Subclasses declare FIELDS, mapping each document field to the default
+    used when a stored document lacks it, and set __slots__ to the same
+    names; PRIVATE lists fields kept out of API responses. The BSON and
+    JSON converters are derived from these declarations once per class, so
+    field lists are never repeated in routes.
+    """
+    __slots__ = ()
+    FIELDS = {}
+    PRIVATE = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if tuple(cls.__slots__) != tuple(cls.FIELDS):
+            raise TypeError(f'{cls.__name__}.__slots__ must match its FIELDS')
+
+        public = tuple(name for name in cls.FIELDS if name not in cls.PRIVATE)
+        cls._bson_fields = tuple(cls.FIELDS)
+        cls._json_fields = public
+        cls._bson_values = attrgetter(*cls._bson_fields)
+        cls._json_values = attrgetter(*public)
+        cls._defaults = tuple(cls.FIELDS.items())
+
+    def to_bson(self):
+        """Return the document to store in MongoDB."""
+        return dict(zip(self._bson_fields, self._bson_values(self)))
+
+    def to_json(self):
+        """Return the document to send to clients, without PRIVATE fields."""
+        return dict(zip(self._json_fields, self._json_values(self)))
+
+    @classmethod
+    def from_bson(cls, document):
+        """Build a model from a stored document without running __init__.
+
+        Values are referenced, not copied; fields missing from older
+        documents get their FIELDS default.
+        """
+        model = cls.__new__(cls)
+        get = document.get
+        for name, default in cls._defaults:
+            setattr(model, name, get(name, default))
+        return model
+
+    # Kept for callers written before to_bson/to_json
+    to_dict = to_json
+    from_dict = from_bson
+
+class User(Model):
+    FIELDS = {
+        '_id': None,
+        'username': None,
+        'email': None,
+        'password_hash': None,
+        'created_at': None
+    }
+    PRIVATE = ('password_hash',)
+    __slots__ = tuple(FIELDS)
 
-class User:
     def __init__(self, username, email, password_hash, _id=None):
         self.username = username
         self.email = email
@@ -9,93 +72,84 @@ class User:
         self._id = _id or ObjectId()
         self.created_at = datetime.utcnow()
 
-    def to_dict(self):
-        return {
-            '_id': str(self._id),
-            'username': self.username,
-            'email': self.email,
-            'created_at': self.created_at.isoformat()
-        }
-
-    @staticmethod
-    def from_dict(data):
-        user = User(
-            username=data['username'],
-            email=data['email'],
-            password_hash=data['password_hash'],
-            _id=data.get('_id')
-        )
-        if 'created_at' in data:
-            user.created_at = data['created_at']
-        return user
-
-class Decklist:
+class Decklist(Model):
+    FIELDS = {
+        '_id': None,
+        'name': None,
+        'format': None,
+        'cards': (),  # List of {name: str, quantity: int}
+        'user_id': None,
+        'archetype': None,
+        'created_at': None,
+        'is_public': True
+    }
+    __slots__ = tuple(FIELDS)
+
     def __init__(self, name, format, cards, user_id, archetype=None, _id=None):
         self.name = name
         self.format = format
-        self.cards = cards  # List of {name: str, quantity: int}
+        self.cards = cards
         self.user_id = user_id
         self.archetype = archetype
         self._id = _id or ObjectId()
         self.created_at = datetime.utcnow()
         self.is_public = True
 
-    def to_dict(self):
-        return {
-            '_id': str(self._id),
-            'name': self.name,
-            'format': self.format,
-            'cards': self.cards,
-            'user_id': str(self.user_id),
-            'archetype': self.archetype,
-            'created_at': self.created_at.isoformat(),
-            'is_public': self.is_public
-        }
-
-class Scenario:
-    def __init__(self, decklist_id, hand, on_play, opponent_archetype, game_number, user_id, mulligan_count=0, _id=None):
+class Scenario(Model):
+    FIELDS = {
+        '_id': None,
+        'decklist_id': None,
+        'hand': (),  # Always 7 cards for London Mulligan
+        'hand_seed': None,  # Seed the hand was drawn with, if any
+        'land_count': None,  # Lands among the 7 cards drawn
+        'mulligan_count': 0,  # How many times mulliganed (0-6)
+        'num_cards': 7,  # Final hand size after bottoming
+        'on_play': True,  # True if on the play, False if on the draw
+        'opponent_archetype': None,
+        'game_number': None,  # 1, 2, or 3
+        'format': None,  # The decklist's format, for filtering without a join
+        'user_id': None,
+        'created_at': None,
+        'keep_votes': 0,
+        'mulligan_votes': 0,
+        'random_key': None,  # Uniform in [0, 1), orders the next-scenario queue
+        'hand_signature': None  # Shared by equivalent scenarios, see deck.hand_signature
+    }
+    PRIVATE = ('random_key',)
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, decklist_id, hand, on_play, opponent_archetype, game_number, user_id, mulligan_count=0, hand_seed=None, land_count=None, format=None, _id=None):
         self.decklist_id = decklist_id
-        self.hand = hand  # Always 7 cards for London Mulligan
-        self.mulligan_count = mulligan_count  # How many times mulliganed (0-6)
-        self.num_cards = 7 - mulligan_count  # Final hand size after bottoming
-        self.on_play = on_play  # True if on the play, False if on the draw
+        self.hand = hand
+        self.hand_seed = hand_seed
+        self.land_count = land_count
+        self.mulligan_count = mulligan_count
+        self.num_cards = 7 - mulligan_count
+        self.on_play = on_play
         self.opponent_archetype = opponent_archetype
-        self.game_number = game_number  # 1, 2, or 3
+        self.game_number = game_number
+        self.format = format
         self.user_id = user_id
         self._id = _id or ObjectId()
         self.created_at = datetime.utcnow()
         self.keep_votes = 0
         self.mulligan_votes = 0
+        self.random_key = random.random()
+        self.hand_signature = hand_signature(hand, on_play, self.num_cards, game_number, opponent_archetype)
+
+class Vote(Model):
+    FIELDS = {
+        '_id': None,
+        'scenario_id': None,
+        'user_id': None,
+        'decision': None,  # 'keep' or 'mulligan'
+        'created_at': None
+    }
+    __slots__ = tuple(FIELDS)
 
-    def to_dict(self):
-        return {
-            '_id': str(self._id),
-            'decklist_id': str(self.decklist_id),
-            'hand': self.hand,
-            'mulligan_count': self.mulligan_count,
-            'num_cards': self.num_cards,
-            'on_play': self.on_play,
-            'opponent_archetype': self.opponent_archetype,
-            'game_number': self.game_number,
-            'user_id': str(self.user_id),
-            'created_at': self.created_at.isoformat(),
-            'keep_votes': self.keep_votes,
-            'mulligan_votes': self.mulligan_votes
-        }
-
-class Vote:
     def __init__(self, scenario_id, user_id, decision, _id=None):
         self.scenario_id = scenario_id
         self.user_id = user_id
-        self.decision = decision  # 'keep' or 'mulligan'
+        self.decision = decision
         self._id = _id or ObjectId()
         self.created_at = datetime.utcnow()
-
-    def to_dict(self):
-        return {
-            '_id': str(self._id),
-            'scenario_id': str(self.scenario_id),
-            'user_id': str(self.user_id),
-            'decision': self.decision,
-            'created_at': self.created_at.isoformat()
-        }
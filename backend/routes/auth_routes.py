@@ -1,11 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from models import User
-from auth import hash_password, check_password, generate_token
-
-auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+from auth import HasherBusy, generate_token
 
 def init_routes(mongo):
+    auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+
     @auth_bp.route('/register', methods=['POST'])
     def register():
         data = request.get_json()
@@ -13,32 +14,33 @@ def init_routes(mongo):
         if not data or not data.get('username') or not data.get('email') or not data.get('password'):
             return jsonify({'message': 'Missing required fields'}), 400
 
-        if mongo.db.users.find_one({'email': data['email']}):
-            return jsonify({'message': 'Email already registered'}), 400
-
-        if mongo.db.users.find_one({'username': data['username']}):
-            return jsonify({'message': 'Username already taken'}), 400
+        try:
+            password_hash = current_app.extensions['password_hasher'].hash(data['password'])
+        except HasherBusy:
+            return busy_response()
 
         user = User(
             username=data['username'],
             email=data['email'],
-            password_hash=hash_password(data['password'])
+            password_hash=password_hash
         )
 
-        mongo.db.users.insert_one({
-            '_id': user._id,
-            'username': user.username,
-            'email': user.email,
-            'password_hash': user.password_hash,
-            'created_at': user.created_at
-        })
+        # The unique email and username indexes reject duplicates, even
+        # between concurrent sign-ups
+        try:
+            mongo.db.users.insert_one(user.to_bson())
+        except DuplicateKeyError as e:
+            field = duplicate_field(e) or existing_field(mongo, user)
+            if field == 'email':
+                return jsonify({'message': 'Email already registered'}), 400
+            return jsonify({'message': 'Username already taken'}), 400
 
         token = generate_token(user._id)
 
         return jsonify({
             'message': 'User registered successfully',
             'token': token,
-            'user': user.to_dict()
+            'user': user.to_json()
         }), 201
 
     @auth_bp.route('/login', methods=['POST'])
@@ -50,16 +52,56 @@ def init_routes(mongo):
 
         user_data = mongo.db.users.find_one({'email': data['email']})
 
-        if not user_data or not check_password(user_data['password_hash'], data['password']):
-            return jsonify({'message': 'Invalid credentials'}), 401
-
-        user = User.from_dict(user_data)
+        # Unknown emails cost the same bcrypt check as wrong passwords
+        hasher = current_app.extensions['password_hasher']
+        try:
+            if not user_data:
+                hasher.check_unknown(data['password'])
+                return jsonify({'message': 'Invalid credentials'}), 401
+            if not hasher.check(user_data['password_hash'], data['password']):
+                return jsonify({'message': 'Invalid credentials'}), 401
+        except HasherBusy:
+            return busy_response()
+
+        # Upgrade the stored hash when the configured cost has changed;
+        # under load this simply waits for a later login
+        if hasher.needs_rehash(user_data['password_hash']):
+            try:
+                mongo.db.users.update_one(
+                    {'_id': user_data['_id']},
+                    {'$set': {'password_hash': hasher.hash(data['password'])}}
+                )
+            except HasherBusy:
+                pass
+
+        user = User.from_bson(user_data)
         token = generate_token(user._id)
 
         return jsonify({
             'message': 'Login successful',
             'token': token,
-            'user': user.to_dict()
+            'user': user.to_json()
         }), 200
 
     return auth_bp
+
+def busy_response():
+    return jsonify({'message': 'Too many requests, please try again'}), 429, {'Retry-After': '1'}
+
+def duplicate_field(error):
+    """Return the users field ('email' or 'username') a DuplicateKeyError
+    is about, from its keyPattern or index name, or None if unknown."""
+    details = error.details or {}
+    key_pattern = details.get('keyPattern') or {}
+    message = details.get('errmsg', str(error))
+
+    for field in ('email', 'username'):
+        if field in key_pattern or f'{field}_1' in message:
+            return field
+
+    return None
+
+def existing_field(mongo, user):
+    """Work out which field collided when the server did not say."""
+    existing = mongo.db.users.find_one({'email': user.email}, {'_id': 1})
+    return 'email' if existing else 'username'
@@ -2,10 +2,30 @@ from flask import Blueprint, request, jsonify
 from bson import ObjectId
 from models import Decklist
 from auth import token_required
+from database import listing_collection
+from stats import summarize, tally_summary
+from conditional import conditional, document_etag, not_modified, not_modified_response, set_validators
+
+# Decklists cannot be edited, so clients may reuse them without revalidating
+DECKLIST_MAX_AGE = 300
+
+def parse_bool(value):
+    if value not in ('true', 'false'):
+        raise ValueError(value)
+    return value == 'true'
+
+# Query parameters accepted by GET /api/decklists/<id>/stats
+STATS_FILTERS = {
+    'num_cards': int,
+    'on_play': parse_bool,
+    'game_number': int,
+    'opponent_archetype': str,
+    'land_count': int
+}
+
+def init_routes(mongo, cache, catalog):
+    decklist_bp = Blueprint('decklists', __name__, url_prefix='/api/decklists')
 
-decklist_bp = Blueprint('decklists', __name__, url_prefix='/api/decklists')
-
-def init_routes(mongo):
     @decklist_bp.route('', methods=['POST'])
     @token_required
     def create_decklist(user_id):
@@ -14,6 +34,14 @@ def init_routes(mongo):
         if not data or not data.get('name') or not data.get('format') or not data.get('cards'):
             return jsonify({'message': 'Missing required fields'}), 400
 
+        if not isinstance(data['cards'], list) or any(
+            not isinstance(card, dict)
+            or not isinstance(card.get('name'), str)
+            or not isinstance(card.get('quantity'), int)
+            for card in data['cards']
+        ):
+            return jsonify({'message': 'Invalid cards (each needs a name and a quantity)'}), 400
+
         decklist = Decklist(
             name=data['name'],
             format=data['format'],
@@ -22,32 +50,26 @@ def init_routes(mongo):
             archetype=data.get('archetype')
         )
 
-        result = mongo.db.decklists.insert_one({
-            '_id': decklist._id,
-            'name': decklist.name,
-            'format': decklist.format,
-            'cards': decklist.cards,
-            'user_id': decklist.user_id,
-            'archetype': decklist.archetype,
-            'created_at': decklist.created_at,
-            'is_public': decklist.is_public
-        })
+        mongo.db.decklists.insert_one(
+            dict(decklist.to_bson(), cards=catalog.encode_cards(decklist.cards))
+        )
+        cache.invalidate('decklists')
 
         return jsonify({
             'message': 'Decklist created successfully',
-            'decklist': decklist.to_dict()
+            'decklist': decklist.to_json()
         }), 201
 
     @decklist_bp.route('', methods=['GET'])
+    @conditional()
+    @cache.cached('decklists')
     def get_decklists():
-        decklists = list(mongo.db.decklists.find({'is_public': True}).sort('created_at', -1).limit(50))
-
-        for decklist in decklists:
-            decklist['_id'] = str(decklist['_id'])
-            decklist['user_id'] = str(decklist['user_id'])
-            decklist['created_at'] = decklist['created_at'].isoformat()
+        decklists = list(listing_collection(
+            mongo, 'decklists', cache.written_recently('decklists')
+        ).find({'is_public': True}).sort('created_at', -1).limit(50))
+        catalog.decode_decklists(decklists)
 
-        return jsonify({'decklists': decklists}), 200
+        return jsonify({'decklists': [Decklist.from_bson(decklist).to_json() for decklist in decklists]}), 200
 
     @decklist_bp.route('/<decklist_id>', methods=['GET'])
     def get_decklist(decklist_id):
@@ -59,22 +81,54 @@ def init_routes(mongo):
         if not decklist:
             return jsonify({'message': 'Decklist not found'}), 404
 
-        decklist['_id'] = str(decklist['_id'])
-        decklist['user_id'] = str(decklist['user_id'])
-        decklist['created_at'] = decklist['created_at'].isoformat()
+        version = decklist.get('updated_at', decklist['created_at'])
+        etag = document_etag(decklist['_id'], version)
+        if not_modified(etag, version):
+            return not_modified_response(etag, version, DECKLIST_MAX_AGE)
 
-        return jsonify({'decklist': decklist}), 200
+        catalog.decode_decklists([decklist])
+        response = jsonify({'decklist': Decklist.from_bson(decklist).to_json()})
+        return set_validators(response, etag, version, DECKLIST_MAX_AGE), 200
+
+    @decklist_bp.route('/<decklist_id>/stats', methods=['GET'])
+    def get_decklist_stats(decklist_id):
+        try:
+            documents = mongo.db.mulligan_stats.find({'decklist_id': ObjectId(decklist_id)})
+        except:
+            return jsonify({'message': 'Invalid decklist ID'}), 400
+
+        filters = {}
+        try:
+            for field, parse in STATS_FILTERS.items():
+                if field in request.args:
+                    filters[field] = parse(request.args[field])
+        except ValueError:
+            return jsonify({'message': 'Invalid filter'}), 400
+
+        stats = summarize(documents, filters)
+
+        # Card counters are keyed by catalog id (or by name for votes cast
+        # before card interning); merge them under the card name
+        cards = {}
+        for name, tally in zip(catalog.decode(list(stats['cards'])), stats['cards'].values()):
+            merged = cards.setdefault(name, {'keep_votes': 0, 'mulligan_votes': 0})
+            merged['keep_votes'] += tally['keep_votes']
+            merged['mulligan_votes'] += tally['mulligan_votes']
+        stats['cards'] = {name: tally_summary(**tally) for name, tally in cards.items()}
+
+        return jsonify({
+            'decklist_id': decklist_id,
+            'filters': filters,
+            'stats': stats
+        }), 200
 
     @decklist_bp.route('/my', methods=['GET'])
+    @conditional(private=True)
     @token_required
     def get_my_decklists(user_id):
         decklists = list(mongo.db.decklists.find({'user_id': ObjectId(user_id)}).sort('created_at', -1))
+        catalog.decode_decklists(decklists)
 
-        for decklist in decklists:
-            decklist['_id'] = str(decklist['_id'])
-            decklist['user_id'] = str(decklist['user_id'])
-            decklist['created_at'] = decklist['created_at'].isoformat()
-
-        return jsonify({'decklists': decklists}), 200
+        return jsonify({'decklists': [Decklist.from_bson(decklist).to_json() for decklist in decklists]}), 200
 
     return decklist_bp
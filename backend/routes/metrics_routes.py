@@ -0,0 +1,19 @@
+import hmac
+from flask import Blueprint, Response, current_app, request, jsonify
+
+def init_routes(metrics):
+    metrics_bp = Blueprint('metrics', __name__, url_prefix='/api/metrics')
+
+    @metrics_bp.route('', methods=['GET'])
+    def get_metrics():
+        token = current_app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'message': 'Token is invalid'}), 401
+
+        body = metrics.render(
+            current_app.extensions.get('response_cache'),
+            current_app.extensions.get('token_cache')
+        )
+        return Response(body, mimetype='text/plain; version=0.0.4')
+
+    return metrics_bp
@@ -1,12 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from bson import ObjectId
+import base64
+import csv
+import io
 import random
-from models import Scenario
-from auth import token_required
+from datetime import datetime, timezone
+from models import Decklist, Scenario
+from stats import count_lands, tally_summary
+from deck import CompiledDeck, compile_decklist, is_valid_seed, new_seed
+from auth import decode_token, token_required
+from metrics import timed
+from routes.vote_routes import user_votes
+from training import WalkLimitReached, next_unvoted
+from database import listing_collection
+from conditional import conditional, document_etag, not_modified, not_modified_response, set_validators
 
-scenario_bp = Blueprint('scenarios', __name__, url_prefix='/api/scenarios')
+def init_routes(mongo, cache, catalog):
+    scenario_bp = Blueprint('scenarios', __name__, url_prefix='/api/scenarios')
 
-def init_routes(mongo):
     @scenario_bp.route('', methods=['POST'])
     @token_required
     def create_scenario(user_id):
@@ -29,7 +40,13 @@ def init_routes(mongo):
 
         # London Mulligan: Always draw 7, then bottom cards based on mulligan count
         mulligan_count = 7 - num_cards
-        hand = generate_hand(decklist['cards'], 7)  # Always generate 7 cards
+        # The seed is stored so the hand can be regenerated from the decklist
+        hand_seed = data.get('seed', new_seed())
+        if not is_valid_seed(hand_seed):
+            return jsonify({'message': 'Invalid seed'}), 400
+
+        compiled = compile_decklist(decklist, catalog.decode_cards)
+        hand = compiled.draw(7, hand_seed)  # Always generate 7 cards
 
         scenario = Scenario(
             decklist_id=ObjectId(data['decklist_id']),
@@ -38,94 +55,462 @@ def init_routes(mongo):
             opponent_archetype=data['opponent_archetype'],
             game_number=data['game_number'],
             user_id=ObjectId(user_id),
-            mulligan_count=mulligan_count
+            mulligan_count=mulligan_count,
+            hand_seed=hand_seed,
+            land_count=count_lands(hand, compiled.lands),
+            format=decklist.get('format')
         )
 
-        mongo.db.scenarios.insert_one({
-            '_id': scenario._id,
-            'decklist_id': scenario.decklist_id,
-            'hand': scenario.hand,
-            'mulligan_count': scenario.mulligan_count,
-            'num_cards': scenario.num_cards,
-            'on_play': scenario.on_play,
-            'opponent_archetype': scenario.opponent_archetype,
-            'game_number': scenario.game_number,
-            'user_id': scenario.user_id,
-            'created_at': scenario.created_at,
-            'keep_votes': scenario.keep_votes,
-            'mulligan_votes': scenario.mulligan_votes
-        })
+        # reuse: hand back an equivalent scenario of this decklist instead
+        # of storing a duplicate, so its votes keep accumulating
+        if data.get('reuse'):
+            existing = mongo.db.scenarios.find_one({
+                'hand_signature': scenario.hand_signature,
+                'decklist_id': scenario.decklist_id
+            })
+            if existing:
+                catalog.decode_scenarios([existing])
+                return jsonify({
+                    'message': 'Equivalent scenario already exists',
+                    'scenario': Scenario.from_bson(existing).to_json(),
+                    'reused': True
+                }), 200
+
+        mongo.db.scenarios.insert_one(scenario_document(scenario, catalog))
+        cache.invalidate('scenarios')
 
         return jsonify({
             'message': 'Scenario created successfully',
-            'scenario': scenario.to_dict()
+            'scenario': scenario.to_json()
         }), 201
 
+    @scenario_bp.route('/batch', methods=['POST'])
+    @token_required
+    def create_scenario_batch(user_id):
+        data = request.get_json()
+
+        if not data or not data.get('decklist_id') or 'count' not in data:
+            return jsonify({'message': 'Missing required fields'}), 400
+
+        count = data['count']
+        if not isinstance(count, int) or count < 1 or count > MAX_BATCH_SIZE:
+            return jsonify({'message': f'Invalid count (must be 1-{MAX_BATCH_SIZE})'}), 400
+
+        # Each field is a fixed value or a list of values drawn uniformly;
+        # repeat a value in the list to weight it
+        distribution = data.get('distribution') or {}
+        if not isinstance(distribution, dict):
+            return jsonify({'message': 'Invalid distribution'}), 400
+        choices = {}
+        for field, default in BATCH_DISTRIBUTION_DEFAULTS.items():
+            values = distribution.get(field, default)
+            if values is None:
+                return jsonify({'message': 'Missing required fields'}), 400
+            choices[field] = values if isinstance(values, list) else [values]
+            if not choices[field]:
+                return jsonify({'message': f'Invalid distribution for {field}'}), 400
+
+        if any(not isinstance(n, int) or isinstance(n, bool) or n < 0 or n > 7 for n in choices['num_cards']):
+            return jsonify({'message': 'Invalid number of cards (must be 0-7)'}), 400
+        if any(not isinstance(value, bool) for value in choices['on_play']):
+            return jsonify({'message': 'Invalid on_play (must be true or false)'}), 400
+        if any(not isinstance(n, int) or isinstance(n, bool) or n < 1 or n > 3 for n in choices['game_number']):
+            return jsonify({'message': 'Invalid game number (must be 1-3)'}), 400
+        if any(not isinstance(value, str) or not value for value in choices['opponent_archetype']):
+            return jsonify({'message': 'Invalid opponent archetype'}), 400
+
+        try:
+            decklist = mongo.db.decklists.find_one({'_id': ObjectId(data['decklist_id'])})
+        except:
+            return jsonify({'message': 'Invalid decklist ID'}), 400
+
+        if not decklist:
+            return jsonify({'message': 'Decklist not found'}), 404
+
+        compiled = compile_decklist(decklist, catalog.decode_cards)
+        scenarios = []
+        for _ in range(count):
+            hand_seed = new_seed()
+            hand = compiled.draw(7, hand_seed)
+            scenarios.append(Scenario(
+                decklist_id=decklist['_id'],
+                hand=hand,
+                on_play=random.choice(choices['on_play']),
+                opponent_archetype=random.choice(choices['opponent_archetype']),
+                game_number=random.choice(choices['game_number']),
+                user_id=ObjectId(user_id),
+                mulligan_count=7 - random.choice(choices['num_cards']),
+                hand_seed=hand_seed,
+                land_count=count_lands(hand, compiled.lands),
+                format=decklist.get('format')
+            ))
+
+        mongo.db.scenarios.insert_many(
+            [scenario_document(scenario, catalog) for scenario in scenarios],
+            ordered=False
+        )
+        cache.invalidate('scenarios')
+
+        def generate():
+            yield '{"message": "Scenarios created successfully", "scenario_ids": ['
+            for i, scenario in enumerate(scenarios):
+                yield f'{", " if i else ""}"{scenario._id}"'
+            yield ']}'
+
+        return Response(generate(), status=201, mimetype='application/json')
+
     @scenario_bp.route('', methods=['GET'])
+    @conditional()
+    @cache.cached('scenarios', bypass=lambda: 'votes' in request.args)
     def get_scenarios():
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        skip = (page - 1) * per_page
+        # ?votes=mine adds the caller's decision to each scenario as my_vote
+        votes = request.args.get('votes')
+        user_id = None
+        if votes is not None:
+            if votes != 'mine':
+                return jsonify({'message': 'Invalid votes (must be "mine")'}), 400
+            token = request.headers.get('Authorization', '').partition(' ')[2]
+            with timed('jwt'):
+                user_id = decode_token(token) if token else None
+            if not user_id:
+                return jsonify({'message': 'Token is invalid or expired'}), 401
+
+        try:
+            page = int(request.args.get('page', 1))
+            per_page = int(request.args.get('per_page', 20))
+        except ValueError:
+            return jsonify({'message': 'Invalid page or per_page'}), 400
+        if page < 1 or per_page < 1 or per_page > MAX_PER_PAGE:
+            return jsonify({'message': f'Invalid page or per_page (per_page must be 1-{MAX_PER_PAGE})'}), 400
+        cursor = request.args.get('cursor')
+        total_mode = request.args.get('total')
+
+        # Keyset mode: ?cursor= (empty for the first page) walks the
+        # (created_at, _id) index instead of skipping over earlier pages
+        query = {}
+        if cursor:
+            try:
+                query = keyset_filter(*decode_cursor(cursor))
+            except:
+                return jsonify({'message': 'Invalid cursor'}), 400
+
+        results = listing_collection(
+            mongo, 'scenarios', cache.written_recently('scenarios')
+        ).find(query).sort(SCENARIO_ORDER)
+        if cursor is None:
+            results = results.skip((page - 1) * per_page)
+
+        # Fetch one extra document to know whether another page exists
+        scenarios = list(results.limit(per_page + 1))
+        next_cursor = None
+        if len(scenarios) > per_page:
+            scenarios = scenarios[:per_page]
+            next_cursor = encode_cursor(scenarios[-1]['created_at'], scenarios[-1]['_id'])
 
-        scenarios = list(mongo.db.scenarios.find().sort('created_at', -1).skip(skip).limit(per_page))
+        catalog.decode_scenarios(scenarios)
 
-        for scenario in scenarios:
-            scenario['_id'] = str(scenario['_id'])
-            scenario['decklist_id'] = str(scenario['decklist_id'])
-            scenario['user_id'] = str(scenario['user_id'])
-            scenario['created_at'] = scenario['created_at'].isoformat()
+        response = {
+            'scenarios': [Scenario.from_bson(scenario).to_json() for scenario in scenarios],
+            'per_page': per_page,
+            'next_cursor': next_cursor
+        }
 
-        total = mongo.db.scenarios.count_documents({})
+        if user_id:
+            decisions = user_votes(mongo, ObjectId(user_id), [scenario['_id'] for scenario in scenarios])
+            for scenario in response['scenarios']:
+                scenario['my_vote'] = decisions.get(scenario['_id'])
+
+        if cursor is None:
+            response['page'] = page
+
+        # Page mode always reported a total; keyset callers opt in
+        if cursor is None or total_mode:
+            if total_mode == 'exact':
+                response['total'] = mongo.db.scenarios.count_documents({})
+            else:
+                response['total'] = mongo.db.scenarios.estimated_document_count()
+
+        if user_id:
+            # Specific to the caller: never stored by shared caches
+            response = jsonify(response)
+            response.add_etag()
+            return set_validators(response, response.get_etag()[0], private=True), 200
+
+        return jsonify(response), 200
+
+    @scenario_bp.route('/next', methods=['GET'])
+    @token_required
+    def get_next_scenario(user_id):
+        filters = {}
+        try:
+            if request.args.get('decklist_id'):
+                filters['decklist_id'] = ObjectId(request.args['decklist_id'])
+            if request.args.get('num_cards'):
+                filters['num_cards'] = int(request.args['num_cards'])
+        except:
+            return jsonify({'message': 'Invalid filter'}), 400
+
+        if request.args.get('format'):
+            filters['format'] = request.args['format']
+
+        try:
+            scenario = next_unvoted(mongo.db, ObjectId(user_id), filters)
+        except WalkLimitReached:
+            # Unvoted scenarios may still exist; another walk starts elsewhere
+            return jsonify({'message': 'No unvoted scenario found this time, please try again'}), 503, {'Retry-After': '1'}
+
+        if not scenario:
+            return jsonify({'message': 'No unvoted scenario found'}), 404
+
+        catalog.decode_scenarios([scenario])
+
+        return jsonify({'scenario': Scenario.from_bson(scenario).to_json()}), 200
+
+    @scenario_bp.route('/export', methods=['GET'])
+    @token_required
+    def export_scenarios(user_id):
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'message': 'Invalid format (must be "ndjson" or "csv")'}), 400
+
+        try:
+            batch_size = int(request.args.get('batch_size', 500))
+        except ValueError:
+            return jsonify({'message': 'Invalid batch size'}), 400
+        if batch_size < 1 or batch_size > MAX_EXPORT_BATCH_SIZE:
+            return jsonify({'message': f'Invalid batch size (must be 1-{MAX_EXPORT_BATCH_SIZE})'}), 400
+
+        query = {}
+        try:
+            if request.args.get('decklist_id'):
+                query['decklist_id'] = ObjectId(request.args['decklist_id'])
+            created_at = {}
+            if request.args.get('since'):
+                created_at['$gte'] = parse_utc(request.args['since'])
+            if request.args.get('until'):
+                created_at['$lt'] = parse_utc(request.args['until'])
+        except:
+            return jsonify({'message': 'Invalid filter'}), 400
+
+        if created_at:
+            query['created_at'] = created_at
+        if request.args.get('opponent_archetype'):
+            query['opponent_archetype'] = request.args['opponent_archetype']
+
+        cursor = listing_collection(mongo, 'scenarios').find(query).sort(
+            [('created_at', 1), ('_id', 1)]
+        ).batch_size(batch_size)
+        scenarios = (
+            Scenario.from_bson(catalog.decode_scenarios([scenario])[0]).to_json()
+            for scenario in cursor
+        )
+
+        # Rows are produced straight off the cursor, one batch in memory at a time
+        if export_format == 'csv':
+            rows, mimetype = csv_rows(scenarios), 'text/csv'
+        else:
+            dumps = current_app.json.dumps
+            rows, mimetype = (dumps(scenario) + '\n' for scenario in scenarios), 'application/x-ndjson'
+
+        return Response(
+            stream_with_context(rows),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=scenarios.{export_format}'}
+        )
+
+    @scenario_bp.route('/<scenario_id>/consensus', methods=['GET'])
+    def get_scenario_consensus(scenario_id):
+        try:
+            scenario = mongo.db.scenarios.find_one(
+                {'_id': ObjectId(scenario_id)},
+                {'hand_signature': 1, 'keep_votes': 1, 'mulligan_votes': 1}
+            )
+        except:
+            return jsonify({'message': 'Invalid scenario ID'}), 400
+
+        if not scenario:
+            return jsonify({'message': 'Scenario not found'}), 404
+
+        signature = scenario.get('hand_signature')
+        if signature:
+            totals = next(listing_collection(mongo, 'scenarios').aggregate([
+                {'$match': {'hand_signature': signature}},
+                {'$group': {
+                    '_id': None,
+                    'scenarios': {'$sum': 1},
+                    'keep_votes': {'$sum': '$keep_votes'},
+                    'mulligan_votes': {'$sum': '$mulligan_votes'}
+                }}
+            ]), None)
+        else:
+            totals = None
+
+        # A secondary that has not seen this scenario yet, or one created
+        # before signatures, counts as a pool of one
+        if not totals:
+            totals = dict(scenario, scenarios=1)
 
         return jsonify({
-            'scenarios': scenarios,
-            'total': total,
-            'page': page,
-            'per_page': per_page
+            'scenario_id': scenario_id,
+            'hand_signature': signature,
+            'scenarios': totals['scenarios'],
+            **tally_summary(totals.get('keep_votes', 0), totals.get('mulligan_votes', 0))
         }), 200
 
     @scenario_bp.route('/<scenario_id>', methods=['GET'])
     def get_scenario(scenario_id):
+        # include=decklist (default) joins the full decklist, decklist_summary
+        # joins it without its card list and none skips the join
+        include = request.args.get('include', 'decklist')
+        if include not in ('decklist', 'decklist_summary', 'none'):
+            return jsonify({'message': 'Invalid include'}), 400
+
+        fields = request.args.get('fields')
+        if fields is not None:
+            fields = [field for field in fields.split(',') if field]
+            if not set(fields) <= SCENARIO_FIELDS:
+                return jsonify({'message': 'Invalid fields'}), 400
+
         try:
-            scenario = mongo.db.scenarios.find_one({'_id': ObjectId(scenario_id)})
+            pipeline = [{'$match': {'_id': ObjectId(scenario_id)}}, {'$limit': 1}]
         except:
             return jsonify({'message': 'Invalid scenario ID'}), 400
 
+        if fields is not None:
+            pipeline.append({'$project': dict.fromkeys(fields + ['decklist_id'], 1)})
+
+        if include != 'none':
+            pipeline.append({'$lookup': {
+                'from': 'decklists',
+                'localField': 'decklist_id',
+                'foreignField': '_id',
+                'as': 'decklist'
+            }})
+
+        if include == 'decklist_summary':
+            pipeline.append({'$project': {'decklist.cards': 0}})
+
+        scenario = next(mongo.db.scenarios.aggregate(pipeline), None)
+
         if not scenario:
             return jsonify({'message': 'Scenario not found'}), 404
 
-        decklist = mongo.db.decklists.find_one({'_id': scenario['decklist_id']})
+        # Only the vote tallies change after creation
+        etag = document_etag(
+            scenario['_id'],
+            scenario.get('keep_votes'),
+            scenario.get('mulligan_votes'),
+            request.query_string.decode('utf-8')
+        )
+        if not_modified(etag):
+            return not_modified_response(etag)
+
+        decklist = scenario.pop('decklist', None)
+        catalog.decode_scenarios([scenario])
 
-        scenario['_id'] = str(scenario['_id'])
-        scenario['decklist_id'] = str(scenario['decklist_id'])
-        scenario['user_id'] = str(scenario['user_id'])
-        scenario['created_at'] = scenario['created_at'].isoformat()
+        # A ?fields= projection is returned as selected, not padded with defaults
+        if fields is None:
+            scenario = Scenario.from_bson(scenario).to_json()
 
         if decklist:
-            decklist['_id'] = str(decklist['_id'])
-            decklist['user_id'] = str(decklist['user_id'])
-            decklist['created_at'] = decklist['created_at'].isoformat()
-            scenario['decklist'] = decklist
+            decklist = catalog.decode_decklists(decklist)[0]
+            scenario['decklist'] = decklist if include == 'decklist_summary' else Decklist.from_bson(decklist).to_json()
 
-        return jsonify({'scenario': scenario}), 200
+        return set_validators(jsonify({'scenario': scenario}), etag), 200
 
     return scenario_bp
 
-def generate_hand(cards, num_cards):
+def generate_hand(cards, num_cards, seed=None):
     """Generate a random hand from the decklist.
 
     Args:
         cards: List of {name, quantity} card objects
         num_cards: Number of cards to draw (typically 7 for London Mulligan)
+        seed: Optional seed to make the hand reproducible
 
     Returns:
         List of card names
     """
-    deck = []
-    for card in cards:
-        deck.extend([card['name']] * card['quantity'])
+    return CompiledDeck(cards).draw(num_cards, seed)
+
+SCENARIO_ORDER = [('created_at', -1), ('_id', -1)]
+
+MAX_PER_PAGE = 100
+
+MAX_EXPORT_BATCH_SIZE = 5000
+
+EXPORT_CSV_FIELDS = [
+    '_id', 'decklist_id', 'user_id', 'created_at', 'on_play', 'game_number',
+    'num_cards', 'mulligan_count', 'land_count', 'opponent_archetype', 'keep_votes',
+    'mulligan_votes', 'hand'
+]
+
+def parse_utc(value):
+    """Parse an ISO 8601 timestamp into the naive UTC datetime MongoDB stores."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def csv_rows(scenarios):
+    """Yield CSV lines for scenarios, header first; the hand is '|'-joined."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
 
-    if len(deck) < num_cards:
-        return random.sample(deck, len(deck))
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(EXPORT_CSV_FIELDS)
+    yield flush()
+
+    for scenario in scenarios:
+        row = dict(scenario, hand='|'.join(scenario['hand']))
+        row['created_at'] = row['created_at'].isoformat()
+        writer.writerow([row.get(field) for field in EXPORT_CSV_FIELDS])
+        yield flush()
+
+MAX_BATCH_SIZE = 500
+
+# Values drawn per scenario in a batch; None marks a required field
+BATCH_DISTRIBUTION_DEFAULTS = {
+    'on_play': [True, False],
+    'game_number': [1, 2, 3],
+    'num_cards': [7],
+    'opponent_archetype': None
+}
+
+# Fields a caller may select with ?fields= on GET /api/scenarios/<id>
+SCENARIO_FIELDS = {
+    'hand', 'hand_seed', 'land_count', 'mulligan_count', 'num_cards', 'on_play',
+    'opponent_archetype', 'game_number', 'format', 'hand_signature', 'user_id', 'created_at',
+    'keep_votes', 'mulligan_votes'
+}
+
+def scenario_document(scenario, catalog):
+    """Build the MongoDB document for a Scenario model, with the hand as card ids."""
+    return dict(scenario.to_bson(), hand=catalog.encode_names(scenario.hand))
+
+def encode_cursor(created_at, scenario_id):
+    """Encode the sort key of the last scenario on a page as an opaque cursor."""
+    raw = f'{created_at.isoformat()}|{scenario_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor.
+
+    Returns:
+        Tuple of (created_at, scenario ObjectId)
+    """
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    created_at, scenario_id = raw.split('|')
+    return datetime.fromisoformat(created_at), ObjectId(scenario_id)
 
-    return random.sample(deck, num_cards)
+def keyset_filter(created_at, scenario_id):
+    """Build the query for scenarios sorting after (created_at, _id) in SCENARIO_ORDER."""
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': scenario_id}}
+    ]}
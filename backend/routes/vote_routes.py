@@ -1,11 +1,18 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from models import Vote
 from auth import token_required
+from conditional import conditional
+from stats import SCENARIO_STATS_PROJECTION, record_vote
 
-vote_bp = Blueprint('votes', __name__, url_prefix='/api/votes')
+# The vote path reads back what the statistics need plus the fresh tallies
+VOTE_TALLY_PROJECTION = dict(SCENARIO_STATS_PROJECTION, keep_votes=1, mulligan_votes=1)
+
+def init_routes(mongo, tallies=None):
+    vote_bp = Blueprint('votes', __name__, url_prefix='/api/votes')
 
-def init_routes(mongo):
     @vote_bp.route('', methods=['POST'])
     @token_required
     def create_vote(user_id):
@@ -18,81 +25,93 @@ def init_routes(mongo):
             return jsonify({'message': 'Invalid decision (must be "keep" or "mulligan")'}), 400
 
         try:
-            scenario = mongo.db.scenarios.find_one({'_id': ObjectId(data['scenario_id'])})
+            scenario_id = ObjectId(data['scenario_id'])
         except:
             return jsonify({'message': 'Invalid scenario ID'}), 400
 
+        vote = Vote(
+            scenario_id=scenario_id,
+            user_id=ObjectId(user_id),
+            decision=data['decision']
+        )
+
+        # Upsert against the unique (scenario_id, user_id) index so a repeat
+        # vote can never create a second document; the pre-image tells us
+        # which tally to move.
+        try:
+            existing_vote = upsert_vote(mongo, vote)
+        except DuplicateKeyError:
+            # A concurrent first vote won the insert; ours is now an update
+            existing_vote = upsert_vote(mongo, vote)
+
+        old_decision = existing_vote['decision'] if existing_vote else None
+        increments = tally_increments(old_decision, vote.decision)
+
+        # The counter update returns the tallies as they are right after
+        # this vote, so the client needs no follow-up read
+        if tallies is not None:
+            # Buffered mode: the increments are written behind, in batches
+            scenario = tallies.scenario(scenario_id)
+        elif increments:
+            scenario = mongo.db.scenarios.find_one_and_update(
+                {'_id': scenario_id},
+                {'$inc': increments},
+                projection=VOTE_TALLY_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            scenario = mongo.db.scenarios.find_one({'_id': scenario_id}, VOTE_TALLY_PROJECTION)
+
         if not scenario:
+            if not existing_vote:
+                mongo.db.votes.delete_one({'_id': vote._id})
             return jsonify({'message': 'Scenario not found'}), 404
 
-        existing_vote = mongo.db.votes.find_one({
-            'scenario_id': ObjectId(data['scenario_id']),
-            'user_id': ObjectId(user_id)
-        })
+        if increments and tallies is not None:
+            tallies.add(scenario, increments)
+        elif increments:
+            record_vote(mongo.db, scenario, increments)
+
+        result = {
+            'scenario_id': scenario_id,
+            'decision': vote.decision,
+            'keep_votes': scenario.get('keep_votes', 0),
+            'mulligan_votes': scenario.get('mulligan_votes', 0)
+        }
 
         if existing_vote:
-            old_decision = existing_vote['decision']
+            return jsonify(dict(result, message='Vote updated successfully')), 200
 
-            mongo.db.votes.update_one(
-                {'_id': existing_vote['_id']},
-                {'$set': {'decision': data['decision']}}
-            )
+        return jsonify(dict(
+            result,
+            message='Vote created successfully',
+            vote=vote.to_json()
+        )), 201
+
+    @vote_bp.route('/lookup', methods=['POST'])
+    @token_required
+    def lookup_votes(user_id):
+        data = request.get_json()
 
-            if old_decision == 'keep':
-                mongo.db.scenarios.update_one(
-                    {'_id': ObjectId(data['scenario_id'])},
-                    {'$inc': {'keep_votes': -1}}
-                )
-            else:
-                mongo.db.scenarios.update_one(
-                    {'_id': ObjectId(data['scenario_id'])},
-                    {'$inc': {'mulligan_votes': -1}}
-                )
-
-            if data['decision'] == 'keep':
-                mongo.db.scenarios.update_one(
-                    {'_id': ObjectId(data['scenario_id'])},
-                    {'$inc': {'keep_votes': 1}}
-                )
-            else:
-                mongo.db.scenarios.update_one(
-                    {'_id': ObjectId(data['scenario_id'])},
-                    {'$inc': {'mulligan_votes': 1}}
-                )
-
-            return jsonify({'message': 'Vote updated successfully'}), 200
+        if not data or not isinstance(data.get('scenario_ids'), list):
+            return jsonify({'message': 'Missing required fields'}), 400
 
-        vote = Vote(
-            scenario_id=ObjectId(data['scenario_id']),
-            user_id=ObjectId(user_id),
-            decision=data['decision']
-        )
+        if len(data['scenario_ids']) > MAX_VOTE_LOOKUP:
+            return jsonify({'message': f'Too many scenario IDs (at most {MAX_VOTE_LOOKUP})'}), 400
 
-        mongo.db.votes.insert_one({
-            '_id': vote._id,
-            'scenario_id': vote.scenario_id,
-            'user_id': vote.user_id,
-            'decision': vote.decision,
-            'created_at': vote.created_at
-        })
+        try:
+            scenario_ids = [ObjectId(scenario_id) for scenario_id in data['scenario_ids']]
+        except:
+            return jsonify({'message': 'Invalid scenario ID'}), 400
 
-        if data['decision'] == 'keep':
-            mongo.db.scenarios.update_one(
-                {'_id': ObjectId(data['scenario_id'])},
-                {'$inc': {'keep_votes': 1}}
-            )
-        else:
-            mongo.db.scenarios.update_one(
-                {'_id': ObjectId(data['scenario_id'])},
-                {'$inc': {'mulligan_votes': 1}}
-            )
+        decisions = user_votes(mongo, ObjectId(user_id), scenario_ids)
 
         return jsonify({
-            'message': 'Vote created successfully',
-            'vote': vote.to_dict()
-        }), 201
+            'votes': {str(scenario_id): decisions.get(scenario_id) for scenario_id in scenario_ids}
+        }), 200
 
     @vote_bp.route('/scenario/<scenario_id>', methods=['GET'])
+    @conditional(private=True)
     @token_required
     def get_user_vote(user_id, scenario_id):
         try:
@@ -106,11 +125,63 @@ def init_routes(mongo):
         if not vote:
             return jsonify({'vote': None}), 200
 
-        vote['_id'] = str(vote['_id'])
-        vote['scenario_id'] = str(vote['scenario_id'])
-        vote['user_id'] = str(vote['user_id'])
-        vote['created_at'] = vote['created_at'].isoformat()
-
-        return jsonify({'vote': vote}), 200
+        return jsonify({'vote': Vote.from_bson(vote).to_json()}), 200
 
     return vote_bp
+
+MAX_VOTE_LOOKUP = 500
+
+def user_votes(mongo, user_id, scenario_ids):
+    """Return a user's decisions on several scenarios with one $in query.
+
+    Returns:
+        Dict of scenario ObjectId to decision, for the scenarios voted on
+    """
+    if not scenario_ids:
+        return {}
+
+    votes = mongo.db.votes.find(
+        {'user_id': user_id, 'scenario_id': {'$in': list(scenario_ids)}},
+        {'_id': 0, 'scenario_id': 1, 'decision': 1}
+    )
+    return {vote['scenario_id']: vote['decision'] for vote in votes}
+
+def upsert_vote(mongo, vote):
+    """Insert or update a user's vote on a scenario in a single round trip.
+
+    Args:
+        mongo: PyMongo instance
+        vote: Vote model carrying the new decision
+
+    Returns:
+        The vote document as it was before the write, or None if it was inserted
+    """
+    return mongo.db.votes.find_one_and_update(
+        {'scenario_id': vote.scenario_id, 'user_id': vote.user_id},
+        {
+            # updated_at lets reconcile_tallies find recently changed votes
+            '$set': {'decision': vote.decision, 'updated_at': vote.created_at},
+            '$setOnInsert': {'_id': vote._id, 'created_at': vote.created_at}
+        },
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+
+def tally_increments(old_decision, new_decision):
+    """Build the combined $inc document for moving a vote between tallies.
+
+    Args:
+        old_decision: Previous decision ('keep', 'mulligan') or None for a new vote
+        new_decision: Decision being recorded
+
+    Returns:
+        Dict of counter field to increment, empty if nothing changes
+    """
+    if old_decision == new_decision:
+        return {}
+
+    increments = {f'{new_decision}_votes': 1}
+    if old_decision:
+        increments[f'{old_decision}_votes'] = -1
+
+    return increments
@@ -0,0 +1,46 @@
+from datetime import datetime
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+from metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def default(value):
+    """Encode the BSON types our documents carry."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes ObjectId and datetime natively.
+
+    Routes can jsonify documents straight from MongoDB instead of
+    converting _id and created_at field by field. Uses orjson when it is
+    installed and the standard library otherwise.
+    """
+
+    @staticmethod
+    def default(value):
+        return default(value)
+
+    def dumps(self, obj, **kwargs):
+        with timed('serialize'):
+            if orjson is None:
+                return super().dumps(obj, **kwargs)
+
+            option = orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,167 @@
+from pymongo import UpdateOne
+from indexes import INDEXES
+
+BASIC_LANDS = {
+    'Plains', 'Island', 'Swamp', 'Mountain', 'Forest', 'Wastes',
+    'Snow-Covered Plains', 'Snow-Covered Island', 'Snow-Covered Swamp',
+    'Snow-Covered Mountain', 'Snow-Covered Forest'
+}
+
+# Scenario fields a hand bucket is keyed by, besides decklist_id
+DIMENSIONS = ['num_cards', 'on_play', 'game_number', 'opponent_archetype', 'land_count']
+
+# rebuild_stats builds the counters here, then renames it over mulligan_stats
+REBUILD_COLLECTION = 'mulligan_stats_rebuild'
+REBUILD_CHUNK_SIZE = 1000
+
+# What the vote path needs to read back from the scenario it updates
+SCENARIO_STATS_PROJECTION = dict.fromkeys(['decklist_id', 'hand'] + DIMENSIONS, 1)
+
+def is_land(card):
+    """Decide whether a decklist card is a land.
+
+    Decklists only store names and quantities, so an explicit is_land or a
+    type line wins when present and basic land names are the fallback.
+    """
+    if 'is_land' in card:
+        return bool(card['is_land'])
+    type_line = card.get('type_line') or card.get('type')
+    if type_line:
+        return 'Land' in type_line
+    return card['name'] in BASIC_LANDS
+
+def count_lands(hand, land_names=None):
+    """Count the lands in a hand, by decklist land names or basic land names."""
+    land_names = BASIC_LANDS if land_names is None else land_names
+    return sum(1 for name in hand if name in land_names)
+
+def stats_updates(scenario, increments):
+    """Build the counter upserts for one vote on a scenario.
+
+    One hand bucket per combination of DIMENSIONS and one per distinct card
+    in the hand, all in mulligan_stats so a vote costs a single bulk_write.
+
+    Args:
+        scenario: Scenario document with decklist_id, hand and DIMENSIONS
+        increments: The $inc applied to the scenario's keep/mulligan tallies
+
+    Returns:
+        List of UpdateOne operations
+    """
+    dimensions = {field: scenario.get(field) for field in DIMENSIONS}
+    if dimensions['land_count'] is None:
+        dimensions['land_count'] = count_lands(scenario['hand'])
+
+    updates = [UpdateOne(
+        {'decklist_id': scenario['decklist_id'], 'scope': 'hand', 'card': None, **dimensions},
+        {'$inc': increments},
+        upsert=True
+    )]
+
+    for card in sorted(set(scenario['hand'])):
+        updates.append(UpdateOne(
+            {
+                'decklist_id': scenario['decklist_id'],
+                'scope': 'card',
+                'card': card,
+                **dict.fromkeys(DIMENSIONS)
+            },
+            {'$inc': increments},
+            upsert=True
+        ))
+
+    return updates
+
+def record_vote(db, scenario, increments):
+    """Apply one vote's tally change to the materialized statistics."""
+    db.mulligan_stats.bulk_write(stats_updates(scenario, increments), ordered=False)
+
+def tally_summary(keep_votes, mulligan_votes):
+    total = keep_votes + mulligan_votes
+    return {
+        'keep_votes': keep_votes,
+        'mulligan_votes': mulligan_votes,
+        'keep_rate': keep_votes / total if total else None
+    }
+
+def summarize(documents, filters=None):
+    """Roll mulligan_stats documents for one decklist up into a response.
+
+    Args:
+        documents: mulligan_stats documents for the decklist
+        filters: Optional {dimension: value} restricting the hand buckets
+
+    Returns:
+        Dict with the overall tally, one breakdown per dimension and the
+        per-card tallies (cards are not broken down by dimension)
+    """
+    filters = filters or {}
+    total = [0, 0]
+    breakdowns = {field: {} for field in DIMENSIONS}
+    cards = {}
+
+    for document in documents:
+        counts = (document.get('keep_votes', 0), document.get('mulligan_votes', 0))
+
+        if document['scope'] == 'card':
+            cards[document['card']] = tally_summary(*counts)
+            continue
+
+        if any(document.get(field) != value for field, value in filters.items()):
+            continue
+
+        total[0] += counts[0]
+        total[1] += counts[1]
+        for field in DIMENSIONS:
+            bucket = breakdowns[field].setdefault(str(document.get(field)), [0, 0])
+            bucket[0] += counts[0]
+            bucket[1] += counts[1]
+
+    return {
+        'total': tally_summary(*total),
+        **{
+            f'by_{field}': {key: tally_summary(*counts) for key, counts in buckets.items()}
+            for field, buckets in breakdowns.items()
+        },
+        'cards': cards
+    }
+
+def rebuild_stats(db):
+    """Recompute mulligan_stats from the scenario tallies.
+
+    Repairs the counters after a failed incremental update and fills them
+    in for scenarios voted on before statistics existed. They are built in
+    a scratch collection that is then renamed over mulligan_stats, so
+    readers never see them empty or half built. A vote cast while it runs
+    on a scenario it has already read is missing from the result until
+    the next rebuild.
+
+    Returns:
+        Number of scenarios with votes that were counted
+    """
+    scratch = db[REBUILD_COLLECTION]
+    scratch.drop()
+    # Created up front, so the rename carries them and the collection exists
+    for keys, options in INDEXES['mulligan_stats']:
+        scratch.create_index(keys, **options)
+
+    counted = 0
+    updates = []
+    query = {'$or': [{'keep_votes': {'$gt': 0}}, {'mulligan_votes': {'$gt': 0}}]}
+    projection = dict(SCENARIO_STATS_PROJECTION, keep_votes=1, mulligan_votes=1)
+    for scenario in db.scenarios.find(query, projection):
+        increments = {
+            'keep_votes': scenario.get('keep_votes', 0),
+            'mulligan_votes': scenario.get('mulligan_votes', 0)
+        }
+        updates.extend(stats_updates(scenario, increments))
+        counted += 1
+        if len(updates) >= REBUILD_CHUNK_SIZE:
+            scratch.bulk_write(updates, ordered=False)
+            updates = []
+
+    if updates:
+        scratch.bulk_write(updates, ordered=False)
+    scratch.rename('mulligan_stats', dropTarget=True)
+
+    return counted
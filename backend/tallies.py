@@ -0,0 +1,220 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from stats import rebuild_stats, stats_updates
+
+logger = logging.getLogger(__name__)
+
+TALLY_FIELDS = ('keep_votes', 'mulligan_votes')
+
+class TallyBuffer:
+    """Write-behind vote tallies.
+
+    Votes are stored immediately by the caller; only the scenario tally
+    and mulligan_stats increments are coalesced here, per scenario, and
+    written with one bulk_write per collection every interval or once
+    max_votes increments are pending. A hot scenario then takes one update
+    per flush instead of one per vote.
+
+    Increments that fail to write are queued again for the next flush. A
+    write that fails with an unknown outcome (e.g. a lost connection) may
+    have been applied, so retrying it can count it twice.
+    Increments still pending when a process dies are lost; the votes are
+    not, so reconcile_tallies restores the counters from them.
+    """
+
+    def __init__(self, db, projection, interval_ms=250, max_votes=500, cache_size=1024, cache_ttl_ms=None):
+        self.db = db
+        self.projection = projection
+        self.interval = interval_ms / 1000
+        self.max_votes = max_votes
+        self.cache_size = cache_size
+        self.cache_ttl = (interval_ms if cache_ttl_ms is None else cache_ttl_ms) / 1000
+        self._scenarios = OrderedDict()  # scenario_id -> (projected document, read at)
+        self._pending = {}  # scenario_id -> (document, increments)
+        self._pending_votes = 0
+        self._retry_stats = []  # mulligan_stats updates whose write failed
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def scenario(self, scenario_id):
+        """Return the projected scenario document, cached for cache_ttl.
+
+        Its tallies include every increment this process has queued. Other
+        workers' votes show up once they have flushed and this copy has been
+        re-read, so a hot scenario costs one read per cache_ttl, not per vote.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scenarios.get(scenario_id)
+            if entry is not None and now - entry[1] < self.cache_ttl:
+                self._scenarios.move_to_end(scenario_id)
+                return entry[0]
+
+        document = self.db.scenarios.find_one({'_id': scenario_id}, self.projection)
+        if document is None:
+            return None
+
+        with self._lock:
+            entry = self._scenarios.get(scenario_id)
+            if entry is not None and entry[1] >= now:
+                return entry[0]  # Another thread re-read it meanwhile
+            # The stored tallies lack what this process still has queued
+            _, pending = self._pending.get(scenario_id, (None, {}))
+            for field, amount in pending.items():
+                document[field] = document.get(field, 0) + amount
+            self._scenarios[scenario_id] = (document, time.monotonic())
+            self._scenarios.move_to_end(scenario_id)
+            while len(self._scenarios) > self.cache_size:
+                self._scenarios.popitem(last=False)
+            return document
+
+    def add(self, scenario, increments):
+        """Queue a vote's increments against a document from scenario()."""
+        self._start()
+
+        with self._lock:
+            _, pending = self._pending.setdefault(scenario['_id'], (scenario, defaultdict(int)))
+            # The cached copy may have been re-read since scenario() returned
+            entry = self._scenarios.get(scenario['_id'])
+            documents = [scenario] if entry is None or entry[0] is scenario else [scenario, entry[0]]
+            for field, amount in increments.items():
+                pending[field] += amount
+                for document in documents:
+                    document[field] = document.get(field, 0) + amount
+            self._pending_votes += 1
+            full = self._pending_votes >= self.max_votes
+
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every pending increment; returns the scenarios updated.
+
+        Writes that fail are queued again and the error is re-raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_votes = 0
+            stats, self._retry_stats = self._retry_stats, []
+
+        entries = []
+        for scenario_id, (scenario, increments) in pending.items():
+            increments = {field: amount for field, amount in increments.items() if amount}
+            if increments:
+                entries.append((scenario_id, scenario, increments))
+
+        error = None
+        failed = set()
+        if entries:
+            try:
+                self.db.scenarios.bulk_write(
+                    [UpdateOne({'_id': scenario_id}, {'$inc': increments}) for scenario_id, _, increments in entries],
+                    ordered=False
+                )
+            except Exception as e:
+                error = e
+                failed = failed_indexes(e, len(entries))
+                self._requeue([entries[i] for i in sorted(failed)])
+
+        # Statistics follow only the tallies that were written
+        for i, (_, scenario, increments) in enumerate(entries):
+            if i not in failed:
+                stats.extend(stats_updates(scenario, increments))
+
+        if stats:
+            try:
+                self.db.mulligan_stats.bulk_write(stats, ordered=False)
+            except Exception as e:
+                error = error or e
+                with self._lock:
+                    self._retry_stats.extend(stats[i] for i in sorted(failed_indexes(e, len(stats))))
+
+        if error is not None:
+            logger.error('Flushing vote tallies failed; the failed writes are retried on the next flush', exc_info=error)
+            raise error
+
+        return len(entries)
+
+    def _requeue(self, entries):
+        with self._lock:
+            for scenario_id, scenario, increments in entries:
+                _, pending = self._pending.setdefault(scenario_id, (scenario, defaultdict(int)))
+                for field, amount in increments.items():
+                    pending[field] += amount
+
+    def _start(self):
+        # Started lazily per process: a thread does not survive gunicorn's fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='tally-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # Logged by flush; keep flushing later votes
+
+def failed_indexes(error, count):
+    """Return the indexes of the operations a failed bulk_write did not apply.
+
+    An unordered BulkWriteError lists them; any other error leaves the
+    outcome unknown, so every operation is treated as failed.
+    """
+    if isinstance(error, BulkWriteError):
+        return {write_error['index'] for write_error in error.details.get('writeErrors', [])}
+    return set(range(count))
+
+def reconcile_tallies(db, since=None):
+    """Recompute scenario tallies from the votes collection.
+
+    Repairs counters after buffered increments were lost. With since, only
+    scenarios with a vote cast or changed at or after that time are
+    recomputed. Run it while no buffered writer is running, or increments
+    they still hold will be counted twice when they flush.
+
+    Returns:
+        Number of scenarios whose tallies were rewritten
+    """
+    match = {}
+    if since is not None:
+        scenario_ids = db.votes.distinct('scenario_id', {'$or': [
+            {'created_at': {'$gte': since}},
+            {'updated_at': {'$gte': since}}
+        ]})
+        match = {'scenario_id': {'$in': scenario_ids}}
+
+    tallies = defaultdict(lambda: dict.fromkeys(TALLY_FIELDS, 0))
+    for group in db.votes.aggregate([
+        {'$match': match},
+        {'$group': {'_id': {'scenario_id': '$scenario_id', 'decision': '$decision'}, 'count': {'$sum': 1}}}
+    ]):
+        tallies[group['_id']['scenario_id']][f"{group['_id']['decision']}_votes"] = group['count']
+
+    if since is None:
+        # Scenarios whose votes have all gone still need their counts zeroed
+        voted = {'$or': [{field: {'$gt': 0}} for field in TALLY_FIELDS]}
+        scenario_ids = [scenario['_id'] for scenario in db.scenarios.find(voted, {'_id': 1})]
+    for scenario_id in scenario_ids:
+        tallies.setdefault(scenario_id, dict.fromkeys(TALLY_FIELDS, 0))
+
+    updates = [UpdateOne({'_id': scenario_id}, {'$set': counts}) for scenario_id, counts in tallies.items()]
+    if updates:
+        db.scenarios.bulk_write(updates, ordered=False)
+        rebuild_stats(db)
+
+    return len(updates)
@@ -4,8 +4,25 @@ from app import create_app
 from flask_pymongo import PyMongo
 
 @pytest.fixture
-def app():
+def mock_client():
+    """Create a shared mongomock client for the app and the tests."""
+    mock_client = mongomock.MongoClient()
+
+    yield mock_client
+
+    # Clear the database after each test
+    mock_client.drop_database('test_db')
+
+@pytest.fixture
+def app(mock_client, monkeypatch):
     """Create and configure a test app instance."""
+    # Patch PyMongo to use mongomock before the app binds to it
+    def mock_init(self, app=None, *args, **kwargs):
+        self.db = mock_client['test_db']
+        self.cx = mock_client
+
+    monkeypatch.setattr(PyMongo, '__init__', mock_init)
+
     app = create_app('development')
     app.config['TESTING'] = True
     app.config['MONGO_URI'] = 'mongodb://localhost:27017/test_db'
@@ -18,22 +35,10 @@ def client(app):
     return app.test_client()
 
 @pytest.fixture
-def mongo(app, monkeypatch):
+def mongo(app):
     """Create a mock MongoDB instance."""
-    mock_client = mongomock.MongoClient()
-
-    # Patch PyMongo to use mongomock
-    def mock_init(self, app):
-        self.db = mock_client['test_db']
-        self.cx = mock_client
-
-    monkeypatch.setattr(PyMongo, '__init__', mock_init)
-
     with app.app_context():
-        mongo_instance = PyMongo(app)
-        yield mongo_instance
-        # Clear the database after each test
-        mock_client.drop_database('test_db')
+        yield PyMongo(app)
 
 @pytest.fixture
 def auth_headers(client, mongo):
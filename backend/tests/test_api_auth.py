@@ -1,5 +1,6 @@
 import pytest
 import json
+from datetime import datetime
 
 class TestAuthAPI:
     def test_register_success(self, client, mongo):
@@ -142,6 +143,19 @@ class TestAuthAPI:
         json_data = response.get_json()
         assert 'invalid' in json_data['message'].lower()
 
+    def test_login_unknown_email_checks_password(self, app, client, mongo, mocker):
+        """Test that an unknown email costs a bcrypt check like a wrong password."""
+        check = mocker.spy(app.extensions['password_hasher'], 'check')
+
+        response = client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'nobody@example.com', 'password': 'password123'}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 401
+        assert check.call_count == 1
+
     def test_login_missing_fields(self, client, mongo):
         """Test login with missing fields."""
         login_data = {
@@ -156,3 +170,74 @@ class TestAuthAPI:
         )
 
         assert response.status_code == 400
+
+    def test_login_rehashes_on_cost_change(self, app, client, mongo):
+        """Test that logging in upgrades a hash made with an old cost."""
+        from auth import hash_password, hash_rounds
+
+        mongo.db.users.insert_one({
+            'username': 'olduser',
+            'email': 'old@example.com',
+            'password_hash': hash_password('password123', 4),
+            'created_at': datetime.utcnow()
+        })
+        app.extensions['password_hasher'].rounds = 5
+
+        response = client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'old@example.com', 'password': 'password123'}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        user = mongo.db.users.find_one({'email': 'old@example.com'})
+        assert hash_rounds(user['password_hash']) == 5
+
+    def test_register_busy(self, app, client, mongo, mocker):
+        """Test that a saturated hashing queue answers 429."""
+        from auth import HasherBusy
+
+        mocker.patch.object(app.extensions['password_hasher'], 'hash', side_effect=HasherBusy)
+
+        data = {
+            'username': 'busyuser',
+            'email': 'busy@example.com',
+            'password': 'password123'
+        }
+
+        response = client.post('/api/auth/register', data=json.dumps(data), content_type='application/json')
+
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+
+    def test_duplicate_field_from_key_pattern(self):
+        """Test mapping a server DuplicateKeyError to the colliding field."""
+        from pymongo.errors import DuplicateKeyError
+        from routes.auth_routes import duplicate_field
+
+        email_error = DuplicateKeyError('E11000', 11000, {'keyPattern': {'email': 1}})
+        username_error = DuplicateKeyError(
+            'E11000', 11000,
+            {'errmsg': 'E11000 duplicate key error collection: db.users index: username_1'}
+        )
+
+        assert duplicate_field(email_error) == 'email'
+        assert duplicate_field(username_error) == 'username'
+        assert duplicate_field(DuplicateKeyError('E11000')) is None
+
+    def test_register_single_write(self, client, mongo, mocker):
+        """Test that registration does not look users up before inserting."""
+        import mongomock
+
+        find_one = mocker.spy(mongomock.collection.Collection, 'find_one')
+
+        data = {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password': 'password123'
+        }
+
+        response = client.post('/api/auth/register', data=json.dumps(data), content_type='application/json')
+
+        assert response.status_code == 201
+        find_one.assert_not_called()
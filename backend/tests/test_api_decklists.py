@@ -60,6 +60,15 @@ class TestDecklistAPI:
 
         assert response.status_code == 400
 
+    def test_create_decklist_invalid_cards(self, client, mongo, auth_headers):
+        """Test that card entries that are not objects are rejected."""
+        for cards in (['Mountain'], 'Mountain', [{'name': 'Mountain', 'quantity': 20}, 7]):
+            data = {'name': 'Test Deck', 'format': 'Modern', 'cards': cards}
+
+            response = client.post('/api/decklists', data=json.dumps(data), headers=auth_headers)
+
+            assert response.status_code == 400
+
     def test_get_all_decklists(self, client, mongo, auth_headers):
         """Test retrieving all public decklists."""
         # Create a decklist first
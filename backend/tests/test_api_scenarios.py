@@ -1,6 +1,7 @@
 import pytest
 import json
 from bson import ObjectId
+from routes.scenario_routes import generate_hand
 
 class TestScenarioAPI:
     @pytest.fixture
@@ -126,6 +127,13 @@ class TestScenarioAPI:
         assert json_data['page'] == 1
         assert json_data['per_page'] == 10
 
+    def test_get_scenarios_invalid_pagination(self, client, mongo):
+        """Test that out-of-range and non-integer page arguments are rejected."""
+        for query in ('per_page=0', 'per_page=-5', 'per_page=101', 'per_page=ten', 'page=0', 'page=-1', 'page=x', 'cursor=&per_page=0'):
+            response = client.get(f'/api/scenarios?{query}')
+
+            assert response.status_code == 400, query
+
     def test_get_scenario_by_id(self, client, mongo, auth_headers, sample_decklist):
         """Test retrieving a specific scenario."""
         # Create a scenario
@@ -157,3 +165,313 @@ class TestScenarioAPI:
         response = client.get(f'/api/scenarios/{fake_id}')
 
         assert response.status_code == 404
+
+    def test_get_scenarios_cursor_pagination(self, client, mongo, auth_headers, sample_decklist):
+        """Test walking all scenarios with keyset cursors."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Aggro',
+            'game_number': 1
+        }
+
+        created = []
+        for _ in range(5):
+            response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+            created.append(response.get_json()['scenario']['_id'])
+
+        seen = []
+        response = client.get('/api/scenarios?cursor=&per_page=2')
+        json_data = response.get_json()
+        assert 'page' not in json_data
+        assert 'total' not in json_data
+        seen.extend(s['_id'] for s in json_data['scenarios'])
+
+        while json_data['next_cursor']:
+            response = client.get(f"/api/scenarios?cursor={json_data['next_cursor']}&per_page=2")
+            assert response.status_code == 200
+            json_data = response.get_json()
+            seen.extend(s['_id'] for s in json_data['scenarios'])
+
+        assert sorted(seen) == sorted(created)
+        assert len(seen) == len(set(seen))
+
+        paged = client.get('/api/scenarios?page=1&per_page=5').get_json()
+        assert [s['_id'] for s in paged['scenarios']] == seen
+        assert paged['total'] == 5
+
+    def test_get_scenarios_cursor_total(self, client, mongo):
+        """Test that keyset callers can ask for the exact total."""
+        response = client.get('/api/scenarios?cursor=&total=exact')
+
+        assert response.status_code == 200
+        assert response.get_json()['total'] == 0
+
+    def test_get_scenarios_invalid_cursor(self, client, mongo):
+        """Test that a malformed cursor is rejected."""
+        response = client.get('/api/scenarios?cursor=not-a-cursor')
+
+        assert response.status_code == 400
+
+    def test_create_scenario_seeded_hand(self, client, mongo, auth_headers, sample_decklist):
+        """Test that a stored seed regenerates the scenario's hand."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1,
+            'seed': 1234
+        }
+
+        response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+        scenario = response.get_json()['scenario']
+
+        decklist = mongo.db.decklists.find_one({'_id': ObjectId(sample_decklist)})
+        cards = client.application.extensions['card_catalog'].decode_cards(decklist['cards'])
+        assert scenario['hand_seed'] == 1234
+        assert scenario['hand'] == generate_hand(cards, 7, seed=1234)
+
+    def test_create_scenario_invalid_seed(self, client, mongo, auth_headers, sample_decklist):
+        """Test that a non-integer seed is rejected."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1,
+            'seed': 'abc'
+        }
+
+        response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_create_scenario_reuse(self, client, mongo, auth_headers, sample_decklist):
+        """Test that reuse returns the existing scenario for an equivalent hand."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1,
+            'seed': 1234
+        }
+
+        first = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+        second = client.post('/api/scenarios', data=json.dumps(dict(data, reuse=True)), headers=auth_headers)
+
+        assert first.status_code == 201
+        assert second.status_code == 200
+        assert second.get_json()['reused'] is True
+        assert second.get_json()['scenario']['_id'] == first.get_json()['scenario']['_id']
+        assert mongo.db.scenarios.count_documents({}) == 1
+
+    def test_get_scenario_consensus(self, client, mongo, auth_headers, sample_decklist):
+        """Test that consensus pools the votes of every equivalent scenario."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1,
+            'seed': 1234
+        }
+        scenario_ids = [
+            client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers).get_json()['scenario']['_id']
+            for _ in range(2)
+        ]
+        mongo.db.scenarios.update_one({'_id': ObjectId(scenario_ids[0])}, {'$set': {'keep_votes': 3, 'mulligan_votes': 1}})
+        mongo.db.scenarios.update_one({'_id': ObjectId(scenario_ids[1])}, {'$set': {'keep_votes': 1}})
+
+        response = client.get(f'/api/scenarios/{scenario_ids[1]}/consensus')
+
+        assert response.status_code == 200
+        consensus = response.get_json()
+        assert consensus['scenarios'] == 2
+        assert consensus['keep_votes'] == 4
+        assert consensus['mulligan_votes'] == 1
+
+    def test_get_scenario_consensus_not_found(self, client, mongo):
+        """Test consensus for missing and malformed scenario ids."""
+        assert client.get(f'/api/scenarios/{ObjectId()}/consensus').status_code == 404
+        assert client.get('/api/scenarios/not-an-id/consensus').status_code == 400
+
+    def test_create_scenario_batch(self, client, mongo, auth_headers, sample_decklist):
+        """Test generating many scenarios in one request."""
+        data = {
+            'decklist_id': sample_decklist,
+            'count': 25,
+            'distribution': {
+                'on_play': [True, False],
+                'game_number': 2,
+                'num_cards': [7, 6],
+                'opponent_archetype': ['Aggro', 'Control']
+            }
+        }
+
+        response = client.post(
+            '/api/scenarios/batch',
+            data=json.dumps(data),
+            headers=auth_headers
+        )
+
+        assert response.status_code == 201
+        scenario_ids = json.loads(response.get_data(as_text=True))['scenario_ids']
+        assert len(scenario_ids) == 25
+
+        scenarios = list(mongo.db.scenarios.find({'_id': {'$in': [ObjectId(i) for i in scenario_ids]}}))
+        assert len(scenarios) == 25
+        for scenario in scenarios:
+            assert len(scenario['hand']) == 7
+            assert scenario['game_number'] == 2
+            assert scenario['num_cards'] in (6, 7)
+            assert scenario['opponent_archetype'] in ('Aggro', 'Control')
+
+    def test_create_scenario_batch_invalid_count(self, client, mongo, auth_headers, sample_decklist):
+        """Test that batch sizes outside the limit are rejected."""
+        data = {
+            'decklist_id': sample_decklist,
+            'count': 0,
+            'distribution': {'opponent_archetype': 'Aggro'}
+        }
+
+        response = client.post('/api/scenarios/batch', data=json.dumps(data), headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_create_scenario_batch_invalid_distribution(self, client, mongo, auth_headers, sample_decklist):
+        """Test that a distribution that is not an object is rejected."""
+        for distribution in (['Aggro'], 'Aggro'):
+            data = {'decklist_id': sample_decklist, 'count': 2, 'distribution': distribution}
+
+            response = client.post('/api/scenarios/batch', data=json.dumps(data), headers=auth_headers)
+
+            assert response.status_code == 400
+
+    def test_create_scenario_batch_invalid_values(self, client, mongo, auth_headers, sample_decklist):
+        """Test that every value in a distribution list is validated."""
+        for distribution in (
+            {'opponent_archetype': [None, '']},
+            {'opponent_archetype': ['Aggro', 3]},
+            {'opponent_archetype': 'Aggro', 'on_play': ['x']},
+            {'opponent_archetype': 'Aggro', 'game_number': [9]},
+            {'opponent_archetype': 'Aggro', 'game_number': [1, '2']}
+        ):
+            data = {'decklist_id': sample_decklist, 'count': 2, 'distribution': distribution}
+
+            response = client.post('/api/scenarios/batch', data=json.dumps(data), headers=auth_headers)
+
+            assert response.status_code == 400, distribution
+        assert mongo.db.scenarios.count_documents({}) == 0
+
+    def test_create_scenario_batch_missing_archetype(self, client, mongo, auth_headers, sample_decklist):
+        """Test that a batch without an opponent archetype is rejected."""
+        data = {
+            'decklist_id': sample_decklist,
+            'count': 5
+        }
+
+        response = client.post('/api/scenarios/batch', data=json.dumps(data), headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_get_scenario_decklist_summary(self, client, mongo, auth_headers, sample_decklist):
+        """Test joining the decklist without its card list."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1
+        }
+
+        create_response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+        scenario_id = create_response.get_json()['scenario']['_id']
+
+        response = client.get(f'/api/scenarios/{scenario_id}?include=decklist_summary')
+
+        assert response.status_code == 200
+        decklist = response.get_json()['scenario']['decklist']
+        assert decklist['name'] == 'Test Deck'
+        assert 'cards' not in decklist
+
+    def test_get_scenario_fields(self, client, mongo, auth_headers, sample_decklist):
+        """Test fetching only the hand and vote counts."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Control',
+            'game_number': 1
+        }
+
+        create_response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+        scenario_id = create_response.get_json()['scenario']['_id']
+
+        response = client.get(
+            f'/api/scenarios/{scenario_id}?include=none&fields=hand,keep_votes,mulligan_votes'
+        )
+
+        assert response.status_code == 200
+        scenario = response.get_json()['scenario']
+        assert set(scenario) == {'_id', 'decklist_id', 'hand', 'keep_votes', 'mulligan_votes'}
+
+    def test_get_scenario_invalid_fields(self, client, mongo):
+        """Test that unknown fields are rejected."""
+        response = client.get(f'/api/scenarios/{ObjectId()}?fields=password_hash')
+
+        assert response.status_code == 400
+
+    def test_export_scenarios_ndjson(self, client, mongo, auth_headers, sample_decklist):
+        """Test streaming scenarios as newline-delimited JSON."""
+        for archetype in ('Aggro', 'Control', 'Aggro'):
+            data = {
+                'decklist_id': sample_decklist,
+                'opponent_archetype': archetype,
+                'game_number': 1
+            }
+            client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+
+        response = client.get(
+            '/api/scenarios/export?opponent_archetype=Aggro&batch_size=1',
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text=True).splitlines()
+        assert len(lines) == 2
+        for line in lines:
+            scenario = json.loads(line)
+            assert scenario['opponent_archetype'] == 'Aggro'
+            assert scenario['decklist_id'] == sample_decklist
+            assert 'keep_votes' in scenario
+
+    def test_export_scenarios_csv(self, client, mongo, auth_headers, sample_decklist):
+        """Test streaming scenarios as CSV."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Aggro',
+            'game_number': 1
+        }
+        client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+
+        response = client.get('/api/scenarios/export?format=csv', headers=auth_headers)
+
+        assert response.status_code == 200
+        lines = response.get_data(as_text=True).splitlines()
+        assert lines[0].startswith('_id,decklist_id')
+        assert len(lines) == 2
+
+    def test_export_scenarios_date_range(self, client, mongo, auth_headers, sample_decklist):
+        """Test filtering the export by creation date."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Aggro',
+            'game_number': 1
+        }
+        client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+
+        response = client.get('/api/scenarios/export?until=2000-01-01T00:00:00Z', headers=auth_headers)
+
+        assert response.get_data(as_text=True) == ''
+
+    def test_export_scenarios_invalid_filter(self, client, mongo, auth_headers):
+        """Test that malformed filters are rejected."""
+        response = client.get('/api/scenarios/export?since=yesterday', headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_export_scenarios_unauthorized(self, client, mongo):
+        """Test that exporting requires authentication."""
+        response = client.get('/api/scenarios/export')
+
+        assert response.status_code == 401
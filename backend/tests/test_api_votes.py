@@ -188,3 +188,131 @@ class TestVoteAPI:
 
         assert scenario['keep_votes'] == 1
         assert scenario['mulligan_votes'] == 0
+
+    def test_update_vote_moves_tally(self, client, mongo, auth_headers, sample_scenario):
+        """Test that changing a vote moves the count between tallies."""
+        data = {
+            'scenario_id': sample_scenario,
+            'decision': 'keep'
+        }
+
+        client.post('/api/votes', data=json.dumps(data), headers=auth_headers)
+
+        data['decision'] = 'mulligan'
+        client.post('/api/votes', data=json.dumps(data), headers=auth_headers)
+
+        response = client.get(f'/api/scenarios/{sample_scenario}')
+        scenario = response.get_json()['scenario']
+
+        assert scenario['keep_votes'] == 0
+        assert scenario['mulligan_votes'] == 1
+        assert mongo.db.votes.count_documents({'scenario_id': ObjectId(sample_scenario)}) == 1
+
+    def test_repeat_vote_is_idempotent(self, client, mongo, auth_headers, sample_scenario):
+        """Test that repeating the same vote does not change the tallies."""
+        data = {
+            'scenario_id': sample_scenario,
+            'decision': 'keep'
+        }
+
+        client.post('/api/votes', data=json.dumps(data), headers=auth_headers)
+        response = client.post('/api/votes', data=json.dumps(data), headers=auth_headers)
+
+        assert response.status_code == 200
+
+        scenario = mongo.db.scenarios.find_one({'_id': ObjectId(sample_scenario)})
+        assert scenario['keep_votes'] == 1
+        assert scenario['mulligan_votes'] == 0
+
+    def test_vote_returns_fresh_tallies(self, client, mongo, auth_headers, sample_scenario):
+        """Test that a vote response carries the updated tallies and decision."""
+        data = {
+            'scenario_id': sample_scenario,
+            'decision': 'keep'
+        }
+
+        created = client.post('/api/votes', data=json.dumps(data), headers=auth_headers).get_json()
+        data['decision'] = 'mulligan'
+        updated = client.post('/api/votes', data=json.dumps(data), headers=auth_headers).get_json()
+        repeated = client.post('/api/votes', data=json.dumps(data), headers=auth_headers).get_json()
+
+        assert (created['decision'], created['keep_votes'], created['mulligan_votes']) == ('keep', 1, 0)
+        assert (updated['decision'], updated['keep_votes'], updated['mulligan_votes']) == ('mulligan', 0, 1)
+        assert (repeated['keep_votes'], repeated['mulligan_votes']) == (0, 1)
+        assert updated['scenario_id'] == sample_scenario
+
+    def test_create_vote_scenario_not_found(self, client, mongo, auth_headers):
+        """Test voting on a missing scenario leaves no vote behind."""
+        data = {
+            'scenario_id': str(ObjectId()),
+            'decision': 'keep'
+        }
+
+        response = client.post(
+            '/api/votes',
+            data=json.dumps(data),
+            headers=auth_headers
+        )
+
+        assert response.status_code == 404
+        assert mongo.db.votes.count_documents({}) == 0
+
+    def test_lookup_votes(self, client, mongo, auth_headers, sample_scenario):
+        """Test resolving the caller's votes on several scenarios at once."""
+        other_scenario = str(ObjectId())
+        client.post('/api/votes', data=json.dumps({'scenario_id': sample_scenario, 'decision': 'mulligan'}), headers=auth_headers)
+
+        response = client.post(
+            '/api/votes/lookup',
+            data=json.dumps({'scenario_ids': [sample_scenario, other_scenario]}),
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.get_json()['votes'] == {sample_scenario: 'mulligan', other_scenario: None}
+
+    def test_lookup_votes_invalid(self, client, mongo, auth_headers):
+        """Test that malformed and oversized lookups are rejected."""
+        from routes.vote_routes import MAX_VOTE_LOOKUP
+
+        invalid = client.post('/api/votes/lookup', data=json.dumps({'scenario_ids': ['nope']}), headers=auth_headers)
+        too_many = client.post(
+            '/api/votes/lookup',
+            data=json.dumps({'scenario_ids': [str(ObjectId()) for _ in range(MAX_VOTE_LOOKUP + 1)]}),
+            headers=auth_headers
+        )
+
+        assert invalid.status_code == 400
+        assert too_many.status_code == 400
+
+    def test_scenarios_annotated_with_my_vote(self, client, mongo, auth_headers, sample_scenario):
+        """Test GET /api/scenarios?votes=mine marks the caller's votes, uncached."""
+        client.get('/api/scenarios')
+        client.post('/api/votes', data=json.dumps({'scenario_id': sample_scenario, 'decision': 'keep'}), headers=auth_headers)
+
+        response = client.get('/api/scenarios?votes=mine', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.get_json()['scenarios'][0]['my_vote'] == 'keep'
+        assert 'X-Cache' not in response.headers
+        assert response.cache_control.private
+
+    def test_scenarios_my_vote_requires_token(self, client, mongo):
+        """Test that annotating with votes needs a valid token."""
+        assert client.get('/api/scenarios?votes=mine').status_code == 401
+        assert client.get('/api/scenarios?votes=all').status_code == 400
+
+    def test_votes_user_index(self, client, mongo):
+        """Test that the (user_id, scenario_id) index exists for lookups."""
+        indexes = mongo.db.votes.index_information()
+
+        assert any(index['key'] == [('user_id', 1), ('scenario_id', 1)] for index in indexes.values())
+
+    def test_votes_unique_index(self, client, mongo):
+        """Test that the (scenario_id, user_id) unique index exists."""
+        indexes = mongo.db.votes.index_information()
+
+        assert any(
+            index.get('unique') and index['key'] == [('scenario_id', 1), ('user_id', 1)]
+            for index in indexes.values()
+        )
@@ -1,5 +1,7 @@
 import pytest
-from auth import hash_password, check_password, generate_token, decode_token
+import time
+import threading
+from auth import hash_password, check_password, generate_token, decode_token, hash_rounds, HasherBusy, PasswordHasher, TokenCache
 
 class TestAuth:
     def test_hash_password(self):
@@ -51,3 +53,106 @@ class TestAuth:
         with app.app_context():
             result = decode_token('invalid_token')
             assert result is None
+
+    def test_decode_token_cached(self, app, mocker):
+        """Test that a verified token is served from the cache."""
+        with app.app_context():
+            from bson import ObjectId
+            token = generate_token(ObjectId())
+            decode_token(token)
+
+            jwt_decode = mocker.patch('auth.jwt.decode')
+            decoded_id = decode_token(token)
+
+            jwt_decode.assert_not_called()
+            assert decoded_id is not None
+            assert app.extensions['token_cache'].stats()['hits'] == 1
+
+    def test_invalid_token_not_cached(self, app):
+        """Test that invalid tokens never enter the cache."""
+        with app.app_context():
+            decode_token('invalid_token')
+
+            assert app.extensions['token_cache'].stats()['size'] == 0
+
+class TestTokenCache:
+    def test_entry_expires_at_exp(self):
+        """Test that entries never outlive the token's exp."""
+        cache = TokenCache(ttl=300)
+        cache.put('token', 'user', time.time() - 1)
+
+        assert cache.get('token') is None
+
+    def test_bounded_size(self):
+        """Test that the least recently used token is evicted."""
+        cache = TokenCache(max_size=1)
+        cache.put('a', 'user-a', time.time() + 60)
+        cache.put('b', 'user-b', time.time() + 60)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 'user-b'
+
+    def test_hit_rate(self):
+        """Test hit and miss counters."""
+        cache = TokenCache()
+        cache.put('a', 'user-a', time.time() + 60)
+        cache.get('a')
+        cache.get('b')
+
+        assert cache.stats()['hit_rate'] == 0.5
+
+class TestPasswordHasher:
+    def test_hash_uses_configured_rounds(self):
+        """Test that hashes carry the configured cost."""
+        hasher = PasswordHasher(rounds=4)
+        hashed = hasher.hash('test_password_123')
+
+        assert hash_rounds(hashed) == 4
+        assert hasher.check(hashed, 'test_password_123') is True
+
+    def test_process_pool(self):
+        """Test hashing in a worker process."""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        hashed = hasher.hash('test_password_123')
+
+        assert check_password(hashed, 'test_password_123') is True
+
+    def test_needs_rehash(self):
+        """Test detecting hashes made with a different cost."""
+        hasher = PasswordHasher(rounds=5)
+
+        assert hasher.needs_rehash(hash_password('pw', 4)) is True
+        assert hasher.needs_rehash(hash_password('pw', 5)) is False
+
+    def test_timeout_is_busy_and_keeps_slot(self):
+        """Test that a timed-out job raises HasherBusy and holds its slot until it ends."""
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1, timeout=0.2)
+        hasher.hash('warm up the pool')
+
+        with pytest.raises(HasherBusy):
+            hasher._run(time.sleep, 1)
+        with pytest.raises(HasherBusy):
+            hasher.hash('pw')
+
+        time.sleep(1.5)
+        assert check_password(hasher.hash('pw'), 'pw') is True
+
+    def test_busy_when_queue_full(self):
+        """Test that a full queue is rejected instead of waiting."""
+        hasher = PasswordHasher(rounds=4, max_pending=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(*args):
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=hasher._run, args=(slow,))
+        thread.start()
+        started.wait()
+
+        with pytest.raises(HasherBusy):
+            hasher.hash('pw')
+
+        release.set()
+        thread.join()
@@ -0,0 +1,101 @@
+import pytest
+import json
+import time
+from cache import MemoryBackend, ResponseCache
+
+class TestMemoryBackend:
+    def test_set_and_get(self):
+        """Test storing and reading an entry."""
+        backend = MemoryBackend()
+        backend.set('key', b'value', 30)
+
+        assert backend.get('key') == b'value'
+
+    def test_expired_entry(self):
+        """Test that entries past their TTL are dropped."""
+        backend = MemoryBackend()
+        backend.set('key', b'value', 0.01)
+        time.sleep(0.02)
+
+        assert backend.get('key') is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', b'1', 30)
+        backend.set('b', b'2', 30)
+        backend.get('a')
+        backend.set('c', b'3', 30)
+
+        assert backend.get('a') == b'1'
+        assert backend.get('b') is None
+
+    def test_counters_survive_eviction(self):
+        """Test that counters are not subject to LRU eviction."""
+        backend = MemoryBackend(max_entries=1)
+        backend.incr('gen')
+        backend.set('a', b'1', 30)
+        backend.set('b', b'2', 30)
+
+        assert backend.get('gen') == 1
+
+class TestResponseCache:
+    def test_listing_served_from_cache(self, client, mongo):
+        """Test that a repeated listing is a cache hit."""
+        first = client.get('/api/decklists')
+        second = client.get('/api/decklists')
+
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.get_json() == first.get_json()
+
+    def test_query_args_in_key(self, client, mongo):
+        """Test that different query args are cached separately."""
+        client.get('/api/scenarios?page=1')
+        response = client.get('/api/scenarios?page=2')
+
+        assert response.headers['X-Cache'] == 'MISS'
+
+    def test_create_invalidates(self, client, mongo, auth_headers):
+        """Test that creating a decklist invalidates the listing."""
+        client.get('/api/decklists')
+
+        client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Modern', 'cards': [{'name': 'Card', 'quantity': 60}]}),
+            headers=auth_headers
+        )
+        response = client.get('/api/decklists')
+
+        assert response.headers['X-Cache'] == 'MISS'
+        assert len(response.get_json()['decklists']) == 1
+
+    def test_refill_after_write_reads_primary(self, app, client, mongo, auth_headers):
+        """Test that a namespace reads the primary right after an invalidation."""
+        cache = app.extensions['response_cache']
+        assert cache.written_recently('decklists') is False
+
+        client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Modern', 'cards': [{'name': 'Card', 'quantity': 60}]}),
+            headers=auth_headers
+        )
+
+        assert cache.written_recently('decklists') is True
+        assert cache.written_recently('scenarios') is False
+
+    def test_stats(self, app, client, mongo):
+        """Test hit and miss counters."""
+        client.get('/api/decklists')
+        client.get('/api/decklists')
+
+        stats = app.extensions['response_cache'].stats()
+
+        assert stats['decklists'] == {'hits': 1, 'misses': 1}
+
+    def test_disabled_backend(self):
+        """Test that a cache without a backend passes through."""
+        cache = ResponseCache()
+        view = cache.cached('decklists')(lambda: 'body')
+
+        assert view() == 'body'
@@ -0,0 +1,98 @@
+import pytest
+import json
+from bson import ObjectId
+from catalog import CardCatalog, intern_existing
+
+class TestCardCatalog:
+    def test_round_trip(self, mongo):
+        """Test that names encode to ids and decode back."""
+        catalog = CardCatalog(mongo.db)
+
+        ids = catalog.encode_names(['Mountain', 'Lightning Bolt', 'Mountain'])
+
+        assert all(isinstance(card_id, int) for card_id in ids)
+        assert ids[0] == ids[2]
+        assert catalog.decode(ids) == ['Mountain', 'Lightning Bolt', 'Mountain']
+
+    def test_ids_are_stable(self, mongo):
+        """Test that a fresh catalog reuses ids already stored."""
+        ids = CardCatalog(mongo.db).encode_names(['Mountain', 'Island'])
+
+        catalog = CardCatalog(mongo.db)
+
+        assert catalog.encode_names(['Island', 'Mountain', 'Forest'])[:2] == ids[::-1]
+        assert catalog.decode(ids) == ['Mountain', 'Island']
+
+    def test_names_pass_through(self, mongo):
+        """Test that documents still storing names decode unchanged."""
+        catalog = CardCatalog(mongo.db)
+
+        assert catalog.decode(['Mountain']) == ['Mountain']
+        assert catalog.decode_cards([{'name': 'Mountain', 'quantity': 20}]) == [{'name': 'Mountain', 'quantity': 20}]
+
+    def test_decode_reads_ids_from_other_processes(self, mongo):
+        """Test that ids interned elsewhere are read on a miss."""
+        catalog = CardCatalog(mongo.db)
+        catalog.decode([])
+        ids = CardCatalog(mongo.db).encode_names(['Mountain'])
+
+        assert catalog.decode(ids) == ['Mountain']
+
+    def test_decode_unknown_id(self, mongo):
+        """Test that an id missing from the cards collection decodes to a placeholder."""
+        catalog = CardCatalog(mongo.db)
+
+        assert catalog.decode([404]) == ['Unknown card #404']
+
+    def test_encode_cards(self, mongo):
+        """Test that decklist cards keep their other fields."""
+        catalog = CardCatalog(mongo.db)
+        cards = [{'name': 'Mountain', 'quantity': 20}]
+
+        encoded = catalog.encode_cards(cards)
+
+        assert 'name' not in encoded[0]
+        assert encoded[0]['quantity'] == 20
+        assert catalog.decode_cards(encoded) == cards
+
+    def test_intern_existing(self, mongo):
+        """Test rewriting documents that store names."""
+        catalog = CardCatalog(mongo.db)
+        decklist_id = mongo.db.decklists.insert_one({'cards': [{'name': 'Mountain', 'quantity': 60}]}).inserted_id
+        scenario_id = mongo.db.scenarios.insert_one({'hand': ['Mountain', 'Lightning Bolt']}).inserted_id
+
+        assert intern_existing(catalog, mongo.db) == (1, 1)
+
+        decklist = mongo.db.decklists.find_one({'_id': decklist_id})
+        scenario = mongo.db.scenarios.find_one({'_id': scenario_id})
+        assert catalog.decode_cards(decklist['cards']) == [{'name': 'Mountain', 'quantity': 60}]
+        assert catalog.decode(scenario['hand']) == ['Mountain', 'Lightning Bolt']
+        assert scenario['land_count'] == 1
+        assert intern_existing(catalog, mongo.db) == (0, 0)
+
+class TestCatalogAPI:
+    def test_stored_ids_returned_as_names(self, client, mongo, auth_headers):
+        """Test that the API stores ids but responds with names."""
+        decklist_response = client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Modern', 'cards': [{'name': 'Mountain', 'quantity': 60}]}),
+            headers=auth_headers
+        )
+        decklist_id = decklist_response.get_json()['decklist']['_id']
+
+        scenario_response = client.post(
+            '/api/scenarios',
+            data=json.dumps({'decklist_id': decklist_id, 'opponent_archetype': 'Aggro', 'game_number': 1}),
+            headers=auth_headers
+        )
+        scenario_id = scenario_response.get_json()['scenario']['_id']
+
+        stored = mongo.db.scenarios.find_one({'_id': ObjectId(scenario_id)})
+        assert all(isinstance(card, int) for card in stored['hand'])
+
+        response = client.get(f'/api/scenarios/{scenario_id}?include=decklist')
+
+        scenario = response.get_json()['scenario']
+        assert scenario['hand'] == ['Mountain'] * 7
+        assert scenario['decklist']['cards'] == [{'name': 'Mountain', 'quantity': 60}]
+        assert client.get(f'/api/decklists/{decklist_id}').get_json()['decklist']['cards'] == [{'name': 'Mountain', 'quantity': 60}]
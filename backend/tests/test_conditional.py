@@ -0,0 +1,88 @@
+import pytest
+import json
+from bson import ObjectId
+
+class TestConditionalRequests:
+    @pytest.fixture
+    def sample_decklist(self, client, mongo, auth_headers):
+        """Create a sample decklist for testing."""
+        data = {
+            'name': 'Test Deck',
+            'format': 'Modern',
+            'cards': [{'name': 'Mountain', 'quantity': 60}]
+        }
+
+        response = client.post('/api/decklists', data=json.dumps(data), headers=auth_headers)
+
+        return response.get_json()['decklist']['_id']
+
+    @pytest.fixture
+    def sample_scenario(self, client, mongo, auth_headers, sample_decklist):
+        """Create a sample scenario for testing."""
+        data = {
+            'decklist_id': sample_decklist,
+            'opponent_archetype': 'Aggro',
+            'game_number': 1
+        }
+
+        response = client.post('/api/scenarios', data=json.dumps(data), headers=auth_headers)
+
+        return response.get_json()['scenario']['_id']
+
+    def test_decklist_etag_not_modified(self, client, mongo, sample_decklist):
+        """Test that a matching If-None-Match returns 304."""
+        first = client.get(f'/api/decklists/{sample_decklist}')
+        etag = first.headers['ETag']
+
+        second = client.get(f'/api/decklists/{sample_decklist}', headers={'If-None-Match': etag})
+
+        assert first.status_code == 200
+        assert 'max-age=300' in first.headers['Cache-Control']
+        assert second.status_code == 304
+        assert second.get_data() == b''
+
+    def test_decklist_if_modified_since(self, client, mongo, sample_decklist):
+        """Test that If-Modified-Since after creation returns 304."""
+        first = client.get(f'/api/decklists/{sample_decklist}')
+
+        second = client.get(
+            f'/api/decklists/{sample_decklist}',
+            headers={'If-Modified-Since': first.headers['Last-Modified']}
+        )
+
+        assert second.status_code == 304
+
+    def test_scenario_etag_changes_after_vote(self, client, mongo, auth_headers, sample_scenario):
+        """Test that a vote invalidates the scenario ETag."""
+        etag = client.get(f'/api/scenarios/{sample_scenario}').headers['ETag']
+
+        client.post(
+            '/api/votes',
+            data=json.dumps({'scenario_id': sample_scenario, 'decision': 'keep'}),
+            headers=auth_headers
+        )
+        response = client.get(f'/api/scenarios/{sample_scenario}', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.get_json()['scenario']['keep_votes'] == 1
+
+    def test_listing_etag(self, client, mongo, sample_decklist):
+        """Test body-hash ETags on listings, including cache hits."""
+        first = client.get('/api/decklists')
+        second = client.get('/api/decklists', headers={'If-None-Match': first.headers['ETag']})
+
+        assert second.status_code == 304
+        assert 'no-cache' in first.headers['Cache-Control']
+
+    def test_user_vote_private(self, client, mongo, auth_headers, sample_scenario):
+        """Test that per-user responses are marked private."""
+        response = client.get(f'/api/votes/scenario/{sample_scenario}', headers=auth_headers)
+
+        assert 'private' in response.headers['Cache-Control']
+
+    def test_not_found_has_no_etag(self, client, mongo):
+        """Test that errors carry no validators."""
+        response = client.get(f'/api/scenarios/{ObjectId()}')
+
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
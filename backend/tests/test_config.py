@@ -0,0 +1,24 @@
+import pytest
+import os
+import runpy
+from config import ProductionConfig, DevelopmentConfig
+
+class TestProductionConfig:
+    def test_not_debug(self):
+        """Test that production never runs with the debugger."""
+        assert ProductionConfig.DEBUG is False
+        assert DevelopmentConfig.DEBUG is True
+
+    def test_worker_defaults(self):
+        """Test that the WSGI worker settings are usable."""
+        assert ProductionConfig.WSGI_WORKERS >= 1
+        assert ProductionConfig.WSGI_THREADS >= 1
+        assert ProductionConfig.WSGI_BIND.startswith('0.0.0.0:')
+
+    def test_gunicorn_config(self):
+        """Test that gunicorn.conf.py reads its settings from ProductionConfig."""
+        settings = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+
+        assert settings['workers'] == ProductionConfig.WSGI_WORKERS
+        assert settings['worker_class'] == ProductionConfig.WSGI_WORKER_CLASS
+        assert settings['preload_app'] == ProductionConfig.WSGI_PRELOAD_APP
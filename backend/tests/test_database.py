@@ -0,0 +1,49 @@
+import pytest
+from pymongo import ReadPreference
+from config import DevelopmentConfig, ProductionConfig
+from database import client_options, listing_collection
+
+def config_dict(config_class, **overrides):
+    config = {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
+    config.update(overrides)
+    return config
+
+class TestClientOptions:
+    def test_options_from_config(self):
+        """Test that pool and timeout settings reach the client."""
+        options = client_options(config_dict(DevelopmentConfig, MONGO_MAX_POOL_SIZE=10))
+
+        assert options['maxPoolSize'] == 10
+        assert options['serverSelectionTimeoutMS'] == DevelopmentConfig.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        assert options['compressors'] == 'zstd,zlib'
+
+    def test_no_compressors(self):
+        """Test that compression can be turned off."""
+        options = client_options(config_dict(DevelopmentConfig, MONGO_COMPRESSORS=''))
+
+        assert 'compressors' not in options
+
+    def test_invalid_read_preference(self):
+        """Test that an unknown read preference fails at startup."""
+        with pytest.raises(ValueError):
+            client_options(config_dict(DevelopmentConfig, MONGO_LISTING_READ_PREFERENCE='fastest'))
+
+    def test_production_pool_matches_workers(self):
+        """Test that the production pool is sized for one worker's concurrency."""
+        if ProductionConfig.WSGI_WORKER_CLASS == 'gthread':
+            assert ProductionConfig.MONGO_MAX_POOL_SIZE == ProductionConfig.WSGI_THREADS
+
+class TestListingCollection:
+    def test_listing_read_preference(self, app, mongo):
+        """Test that listings read from secondaries when configured."""
+        with app.app_context():
+            collection = listing_collection(mongo, 'scenarios')
+
+        assert collection.read_preference == ReadPreference.SECONDARY_PREFERRED
+
+    def test_listing_primary_after_write(self, app, mongo):
+        """Test that primary=True overrides the listing read preference."""
+        with app.app_context():
+            collection = listing_collection(mongo, 'scenarios', primary=True)
+
+        assert collection.read_preference == ReadPreference.PRIMARY
@@ -0,0 +1,69 @@
+import pytest
+from collections import Counter
+from bson import ObjectId
+from deck import CompiledDeck, compile_decklist, hand_signature, invalidate_decklist
+from routes.scenario_routes import generate_hand
+
+CARDS = [
+    {'name': 'Lightning Bolt', 'quantity': 4},
+    {'name': 'Goblin Guide', 'quantity': 4},
+    {'name': 'Mountain', 'quantity': 20}
+]
+
+class TestCompiledDeck:
+    def test_size(self):
+        """Test that the deck size is the sum of quantities."""
+        assert CompiledDeck(CARDS).size == 28
+
+    def test_card_at_boundaries(self):
+        """Test mapping positions to cards at the cumulative boundaries."""
+        deck = CompiledDeck(CARDS)
+
+        assert deck.card_at(0) == 'Lightning Bolt'
+        assert deck.card_at(3) == 'Lightning Bolt'
+        assert deck.card_at(4) == 'Goblin Guide'
+        assert deck.card_at(8) == 'Mountain'
+        assert deck.card_at(27) == 'Mountain'
+
+    def test_draw_respects_quantities(self):
+        """Test that a draw never uses more copies than the deck holds."""
+        hand = CompiledDeck([{'name': 'A', 'quantity': 1}, {'name': 'B', 'quantity': 6}]).draw(7)
+
+        assert Counter(hand) == {'A': 1, 'B': 6}
+
+    def test_draw_small_deck(self):
+        """Test drawing more cards than the deck holds."""
+        hand = CompiledDeck([{'name': 'A', 'quantity': 3}]).draw(7)
+
+        assert hand == ['A', 'A', 'A']
+
+    def test_seeded_draw_is_reproducible(self):
+        """Test that the same seed always produces the same hand."""
+        assert generate_hand(CARDS, 7, seed=42) == generate_hand(CARDS, 7, seed=42)
+
+    def test_compile_decklist_cached(self):
+        """Test that compiled decks are cached per decklist and can be invalidated."""
+        decklist = {'_id': ObjectId(), 'cards': CARDS}
+
+        compiled = compile_decklist(decklist)
+        assert compile_decklist(decklist) is compiled
+
+        invalidate_decklist(decklist['_id'])
+        assert compile_decklist(decklist) is not compiled
+
+class TestHandSignature:
+    def test_order_independent(self):
+        """Test that card order does not change the signature."""
+        hand = ['Mountain', 'Lightning Bolt', 'Mountain', 'Goblin Guide']
+
+        assert hand_signature(hand, True, 7, 1, 'Aggro') == hand_signature(hand[::-1], True, 7, 1, ' aggro ')
+
+    def test_context_and_multiset(self):
+        """Test that counts and game context are part of the signature."""
+        signature = hand_signature(['Mountain', 'Mountain', 'Lightning Bolt'], True, 7, 1, 'Aggro')
+
+        assert signature != hand_signature(['Mountain', 'Lightning Bolt', 'Lightning Bolt'], True, 7, 1, 'Aggro')
+        assert signature != hand_signature(['Mountain', 'Mountain', 'Lightning Bolt'], False, 7, 1, 'Aggro')
+        assert signature != hand_signature(['Mountain', 'Mountain', 'Lightning Bolt'], True, 6, 1, 'Aggro')
+        assert signature != hand_signature(['Mountain', 'Mountain', 'Lightning Bolt'], True, 7, 2, 'Aggro')
+        assert signature != hand_signature(['Mountain', 'Mountain', 'Lightning Bolt'], True, 7, 1, 'Control')
@@ -0,0 +1,45 @@
+import pytest
+from indexes import INDEXES, ensure_indexes, index_report
+
+class TestIndexes:
+    def test_indexes_created_at_startup(self, app, mongo):
+        """Test that every declared index exists after create_app."""
+        for collection, indexes in INDEXES.items():
+            existing = [
+                info['key'] for info in mongo.db[collection].index_information().values()
+            ]
+            for keys, options in indexes:
+                assert keys in existing
+
+    def test_ensure_indexes_idempotent(self, app, mongo):
+        """Test that ensuring indexes twice changes nothing."""
+        before = mongo.db.users.index_information()
+        ensure_indexes(mongo.db)
+
+        assert mongo.db.users.index_information() == before
+
+    def test_index_report_missing(self, app, mongo):
+        """Test that a dropped index is reported as missing."""
+        mongo.db.decklists.drop_indexes()
+
+        report = index_report(mongo.db)
+
+        assert len(report['decklists']['missing']) == 2
+        assert report['users']['missing'] == []
+
+    def test_index_report_undeclared(self, app, mongo):
+        """Test that an index nobody declared is reported."""
+        mongo.db.scenarios.create_index('opponent_archetype')
+
+        report = index_report(mongo.db)
+
+        assert report['scenarios']['undeclared'] == ['opponent_archetype_1']
+
+    def test_ensure_indexes_cli(self, app, mongo):
+        """Test the ensure-indexes CLI command."""
+        mongo.db.users.drop_indexes()
+
+        result = app.test_cli_runner().invoke(args=['ensure-indexes'])
+
+        assert result.exit_code == 0
+        assert 'users: email_1, username_1' in result.output
@@ -0,0 +1,125 @@
+import pytest
+import json
+import re
+from types import SimpleNamespace
+from config import DevelopmentConfig
+from metrics import CommandMetrics, Metrics, RequestTimings, timed
+
+def command_event(name, micros=2000):
+    return SimpleNamespace(command_name=name, duration_micros=micros)
+
+class TestRequestTimings:
+    def test_server_timing_header(self):
+        """Test the Server-Timing format with a MongoDB command count."""
+        timings = RequestTimings('votes.create_vote')
+        timings.add('mongo', 0.004)
+        timings.commands = 5
+
+        header = timings.server_timing(0.012)
+
+        assert header == 'app;dur=12.00, mongo;dur=4.00;desc="5 commands"'
+
+    def test_timed_outside_request(self):
+        """Test that timed blocks are a no-op without a request."""
+        with timed('jwt'):
+            pass
+
+class TestMetrics:
+    def test_histogram_buckets(self):
+        """Test that a request lands in every bucket at or above its latency."""
+        metrics = Metrics(buckets=(0.01, 0.1))
+
+        metrics.observe_request('scenarios', 'scenarios.get_scenarios', 'GET', 200, 0.05)
+        text = metrics.render()
+
+        assert 'http_request_duration_seconds_bucket{blueprint="scenarios",le="0.01"} 0' in text
+        assert 'http_request_duration_seconds_bucket{blueprint="scenarios",le="0.1"} 1' in text
+        assert 'http_request_duration_seconds_count{blueprint="scenarios"} 1' in text
+        assert 'http_requests_total{endpoint="scenarios.get_scenarios",method="GET",status="200"} 1' in text
+
+    def test_command_listener_outside_request(self):
+        """Test that commands outside a request are charged to 'none'."""
+        metrics = Metrics()
+
+        CommandMetrics(metrics).succeeded(command_event('find'))
+        CommandMetrics(metrics).failed(command_event('insert'))
+
+        text = metrics.render()
+        assert 'mongo_commands_total{endpoint="none",command="find"} 1' in text
+        assert 'mongo_command_failures_total{command="insert"} 1' in text
+
+class TestMetricsAPI:
+    def test_server_timing_on_responses(self, client):
+        """Test that every response carries Server-Timing."""
+        response = client.get('/api/health')
+
+        assert response.headers['Server-Timing'].startswith('app;dur=')
+
+    def test_commands_counted_per_request(self, app):
+        """Test that commands during a request show up in its header and the registry."""
+        listener = CommandMetrics(app.extensions['metrics'])
+
+        with app.test_request_context('/api/health'):
+            app.preprocess_request()
+            listener.succeeded(command_event('find'))
+            listener.succeeded(command_event('update'))
+            response = app.process_response(app.make_response(({'status': 'healthy'}, 200)))
+
+        assert 'mongo;dur=4.00;desc="2 commands"' in response.headers['Server-Timing']
+        assert 'mongo_commands_total{endpoint="health",command="update"} 1' in app.extensions['metrics'].render()
+
+    def test_metrics_endpoint(self, client, mongo):
+        """Test the Prometheus exposition with cache counters."""
+        client.get('/api/scenarios')
+        client.get('/api/scenarios')
+
+        response = client.get('/api/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_count{blueprint="scenarios"} 2' in text
+        assert 'response_cache_hits_total{namespace="scenarios"} 1' in text
+        assert 'token_cache_size' in text
+
+    def test_metrics_token(self, client, app):
+        """Test that a configured METRICS_TOKEN is required."""
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+
+        assert client.get('/api/metrics').status_code == 401
+        assert client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+class TestMetricsOutsideDebug:
+    @pytest.fixture(autouse=True)
+    def production_mode(self, monkeypatch):
+        """Create the app with debug off, as in production."""
+        monkeypatch.setattr(DevelopmentConfig, 'DEBUG', False)
+        monkeypatch.setattr(DevelopmentConfig, 'METRICS_TOKEN', None)
+
+    def test_server_timing_total_only(self, client, mongo):
+        """Test that anonymous responses only carry the total time."""
+        response = client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'nobody@example.com', 'password': 'password123'}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 401
+        assert re.fullmatch(r'app;dur=[\d.]+', response.headers['Server-Timing'])
+
+    def test_server_timing_detail_with_token(self, client, app, mongo):
+        """Test that X-Metrics-Token unlocks the per-phase breakdown."""
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+
+        response = client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'nobody@example.com', 'password': 'password123'}),
+            content_type='application/json',
+            headers={'X-Metrics-Token': 'scrape-secret'}
+        )
+
+        assert 'bcrypt;dur=' in response.headers['Server-Timing']
+
+    def test_metrics_endpoint_requires_token(self, client):
+        """Test that /api/metrics is not served without a METRICS_TOKEN."""
+        assert client.get('/api/metrics').status_code == 404
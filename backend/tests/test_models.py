@@ -156,3 +156,55 @@ class TestVoteModel:
         assert '_id' in vote_dict
         assert 'scenario_id' in vote_dict
         assert 'user_id' in vote_dict
+
+class TestModelConversion:
+    def test_models_are_slotted(self):
+        """Test that model instances carry no per-instance __dict__."""
+        vote = Vote(scenario_id=ObjectId(), user_id=ObjectId(), decision='keep')
+
+        assert not hasattr(vote, '__dict__')
+        with pytest.raises(AttributeError):
+            vote.extra = 1
+
+    def test_user_bson_keeps_private_fields(self):
+        """Test that to_bson stores the password hash and to_json hides it."""
+        user = User(username='testuser', email='test@example.com', password_hash='hashed_password')
+
+        assert user.to_bson()['password_hash'] == 'hashed_password'
+        assert 'password_hash' not in user.to_json()
+
+    def test_bson_round_trip(self):
+        """Test that a stored document converts back to an equal model."""
+        scenario = Scenario(
+            decklist_id=ObjectId(),
+            hand=['Mountain'] * 7,
+            on_play=True,
+            opponent_archetype='Control',
+            game_number=1,
+            user_id=ObjectId(),
+            mulligan_count=1
+        )
+        document = scenario.to_bson()
+
+        restored = Scenario.from_bson(document)
+
+        assert restored.to_bson() == document
+        assert restored.hand is document['hand']
+        assert restored.num_cards == 6
+
+    def test_from_bson_defaults(self):
+        """Test that fields missing from older documents get defaults."""
+        scenario = Scenario.from_bson({'_id': ObjectId(), 'hand': ['Mountain']})
+
+        assert scenario.hand_seed is None
+        assert scenario.keep_votes == 0
+        assert set(scenario.to_json()) == set(Scenario.FIELDS) - set(Scenario.PRIVATE)
+
+    def test_slots_must_match_fields(self):
+        """Test that a model declaring different slots and fields is rejected."""
+        from models import Model
+
+        with pytest.raises(TypeError):
+            class Broken(Model):
+                FIELDS = {'_id': None, 'name': None}
+                __slots__ = ('_id',)
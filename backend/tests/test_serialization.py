@@ -0,0 +1,48 @@
+import pytest
+import json
+from datetime import datetime
+from bson import ObjectId
+import serialization
+from serialization import MongoJSONProvider
+
+class TestMongoJSONProvider:
+    @pytest.fixture(params=['orjson', 'stdlib'])
+    def provider(self, request, app, monkeypatch):
+        """Provide the JSON provider with and without orjson."""
+        if request.param == 'stdlib':
+            monkeypatch.setattr(serialization, 'orjson', None)
+        elif serialization.orjson is None:
+            pytest.skip('orjson is not installed')
+        return MongoJSONProvider(app)
+
+    def test_encodes_object_id(self, provider):
+        """Test that ObjectId is encoded as its hex string."""
+        object_id = ObjectId()
+
+        assert json.loads(provider.dumps({'_id': object_id})) == {'_id': str(object_id)}
+
+    def test_encodes_datetime(self, provider):
+        """Test that datetime is encoded as ISO 8601."""
+        created_at = datetime(2024, 1, 2, 3, 4, 5, 678000)
+
+        assert json.loads(provider.dumps({'created_at': created_at})) == {
+            'created_at': created_at.isoformat()
+        }
+
+    def test_rejects_unknown_types(self, provider):
+        """Test that unsupported types still raise."""
+        with pytest.raises(TypeError):
+            provider.dumps({'value': object()})
+
+    def test_response(self, provider, app):
+        """Test building a JSON response from a raw document."""
+        object_id = ObjectId()
+        with app.app_context():
+            response = provider.response({'_id': object_id, 'nested': [{'id': object_id}]})
+
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == {'_id': str(object_id), 'nested': [{'id': str(object_id)}]}
+
+    def test_app_uses_provider(self, app):
+        """Test that create_app registers the provider."""
+        assert isinstance(app.json, MongoJSONProvider)
@@ -0,0 +1,126 @@
+import pytest
+import json
+from bson import ObjectId
+from stats import count_lands, is_land, rebuild_stats, record_vote, summarize
+
+class TestLands:
+    def test_is_land(self):
+        """Test land detection from flags, type lines and basic names."""
+        assert is_land({'name': 'Mountain'}) is True
+        assert is_land({'name': 'Sacred Foundry', 'type_line': 'Land — Mountain Plains'}) is True
+        assert is_land({'name': 'Inkmoth Nexus', 'is_land': True}) is True
+        assert is_land({'name': 'Lightning Bolt'}) is False
+
+    def test_count_lands(self):
+        """Test counting lands with and without decklist land names."""
+        hand = ['Mountain', 'Sacred Foundry', 'Lightning Bolt']
+
+        assert count_lands(hand) == 1
+        assert count_lands(hand, {'Mountain', 'Sacred Foundry'}) == 2
+
+class TestStatsCounters:
+    def test_record_and_summarize(self, mongo):
+        """Test that votes roll up into totals, breakdowns and card tallies."""
+        decklist_id = ObjectId()
+        scenario = {
+            'decklist_id': decklist_id,
+            'hand': ['Mountain', 'Mountain', 'Lightning Bolt'],
+            'num_cards': 7,
+            'on_play': False,
+            'game_number': 1,
+            'opponent_archetype': 'Aggro',
+            'land_count': 2
+        }
+
+        record_vote(mongo.db, scenario, {'keep_votes': 1})
+        record_vote(mongo.db, scenario, {'mulligan_votes': 1})
+        record_vote(mongo.db, dict(scenario, on_play=True), {'keep_votes': 1})
+
+        stats = summarize(mongo.db.mulligan_stats.find({'decklist_id': decklist_id}))
+
+        assert stats['total'] == {'keep_votes': 2, 'mulligan_votes': 1, 'keep_rate': 2 / 3}
+        assert stats['by_on_play']['False']['keep_rate'] == 0.5
+        assert stats['by_land_count']['2']['keep_votes'] == 2
+        assert stats['cards']['Mountain']['keep_votes'] == 2
+
+    def test_summarize_filters(self, mongo):
+        """Test restricting the hand buckets with filters."""
+        decklist_id = ObjectId()
+        scenario = {
+            'decklist_id': decklist_id,
+            'hand': ['Mountain'],
+            'num_cards': 7,
+            'on_play': True,
+            'game_number': 1,
+            'opponent_archetype': 'Aggro',
+            'land_count': 1
+        }
+        record_vote(mongo.db, scenario, {'keep_votes': 1})
+        record_vote(mongo.db, dict(scenario, land_count=3), {'mulligan_votes': 1})
+
+        stats = summarize(mongo.db.mulligan_stats.find({'decklist_id': decklist_id}), {'land_count': 1})
+
+        assert stats['total']['keep_rate'] == 1.0
+
+    def test_rebuild_stats(self, mongo):
+        """Test recomputing the counters from scenario tallies."""
+        decklist_id = ObjectId()
+        mongo.db.scenarios.insert_one({
+            'decklist_id': decklist_id,
+            'hand': ['Mountain', 'Lightning Bolt'],
+            'num_cards': 6,
+            'on_play': True,
+            'game_number': 2,
+            'opponent_archetype': 'Control',
+            'keep_votes': 3,
+            'mulligan_votes': 1
+        })
+
+        assert rebuild_stats(mongo.db) == 1
+
+        stats = summarize(mongo.db.mulligan_stats.find({'decklist_id': decklist_id}))
+        assert stats['total']['keep_votes'] == 3
+        assert stats['by_land_count'] == {'1': {'keep_votes': 3, 'mulligan_votes': 1, 'keep_rate': 0.75}}
+
+    def test_rebuild_stats_replaces_counters(self, mongo):
+        """Test that a rebuild replaces stale counters and leaves no scratch collection."""
+        mongo.db.mulligan_stats.insert_one({'decklist_id': ObjectId(), 'scope': 'hand', 'keep_votes': 99})
+
+        assert rebuild_stats(mongo.db) == 0
+
+        assert mongo.db.mulligan_stats.count_documents({}) == 0
+        assert 'mulligan_stats_rebuild' not in mongo.db.list_collection_names()
+
+class TestStatsAPI:
+    def test_decklist_stats_after_votes(self, client, mongo, auth_headers):
+        """Test that votes show up in GET /api/decklists/<id>/stats."""
+        decklist_response = client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Modern', 'cards': [{'name': 'Mountain', 'quantity': 60}]}),
+            headers=auth_headers
+        )
+        decklist_id = decklist_response.get_json()['decklist']['_id']
+
+        scenario_response = client.post(
+            '/api/scenarios',
+            data=json.dumps({'decklist_id': decklist_id, 'opponent_archetype': 'Aggro', 'game_number': 1, 'on_play': False}),
+            headers=auth_headers
+        )
+        scenario_id = scenario_response.get_json()['scenario']['_id']
+        assert scenario_response.get_json()['scenario']['land_count'] == 7
+
+        client.post('/api/votes', data=json.dumps({'scenario_id': scenario_id, 'decision': 'keep'}), headers=auth_headers)
+        client.post('/api/votes', data=json.dumps({'scenario_id': scenario_id, 'decision': 'mulligan'}), headers=auth_headers)
+
+        response = client.get(f'/api/decklists/{decklist_id}/stats?on_play=false&land_count=7')
+
+        assert response.status_code == 200
+        stats = response.get_json()['stats']
+        assert stats['total'] == {'keep_votes': 0, 'mulligan_votes': 1, 'keep_rate': 0.0}
+        assert stats['cards']['Mountain']['mulligan_votes'] == 1
+
+    def test_decklist_stats_invalid_filter(self, client, mongo):
+        """Test that malformed filters are rejected."""
+        response = client.get(f'/api/decklists/{ObjectId()}/stats?on_play=maybe')
+
+        assert response.status_code == 400
@@ -0,0 +1,166 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config import DevelopmentConfig
+from tallies import TallyBuffer, reconcile_tallies
+from routes.vote_routes import VOTE_TALLY_PROJECTION
+
+def insert_scenario(mongo, **fields):
+    scenario = dict({
+        'decklist_id': ObjectId(),
+        'hand': ['Mountain'] * 7,
+        'num_cards': 7,
+        'on_play': True,
+        'game_number': 1,
+        'opponent_archetype': 'Aggro',
+        'land_count': 7,
+        'keep_votes': 0,
+        'mulligan_votes': 0
+    }, **fields)
+    return mongo.db.scenarios.insert_one(scenario).inserted_id
+
+class TestTallyBuffer:
+    def test_coalesces_until_flush(self, mongo):
+        """Test that increments are held and written as one update per scenario."""
+        buffer = TallyBuffer(mongo.db, VOTE_TALLY_PROJECTION, interval_ms=60000)
+        scenario_id = insert_scenario(mongo)
+
+        scenario = buffer.scenario(scenario_id)
+        buffer.add(scenario, {'keep_votes': 1})
+        buffer.add(scenario, {'keep_votes': 1})
+        buffer.add(scenario, {'keep_votes': -1, 'mulligan_votes': 1})
+
+        assert mongo.db.scenarios.find_one({'_id': scenario_id})['keep_votes'] == 0
+        assert (scenario['keep_votes'], scenario['mulligan_votes']) == (1, 1)
+
+        assert buffer.flush() == 1
+
+        stored = mongo.db.scenarios.find_one({'_id': scenario_id})
+        assert (stored['keep_votes'], stored['mulligan_votes']) == (1, 1)
+        assert mongo.db.mulligan_stats.count_documents({'decklist_id': scenario['decklist_id']}) == 2
+        assert buffer.flush() == 0
+
+    def test_cached_scenario(self, mongo):
+        """Test that a scenario is read once and keeps its queued tallies after eviction."""
+        buffer = TallyBuffer(mongo.db, VOTE_TALLY_PROJECTION, interval_ms=60000, cache_size=1)
+        first, second = insert_scenario(mongo), insert_scenario(mongo)
+
+        assert buffer.scenario(first) is buffer.scenario(first)
+        buffer.add(buffer.scenario(first), {'keep_votes': 1})
+        buffer.scenario(second)
+
+        assert buffer.scenario(first)['keep_votes'] == 1
+        assert buffer.scenario(ObjectId()) is None
+
+    def test_cached_scenario_expires(self, mongo):
+        """Test that a cached scenario is re-read after its TTL with queued increments."""
+        buffer = TallyBuffer(mongo.db, VOTE_TALLY_PROJECTION, interval_ms=60000, cache_ttl_ms=0)
+        scenario_id = insert_scenario(mongo)
+        buffer.add(buffer.scenario(scenario_id), {'keep_votes': 1})
+
+        # Another worker flushes its own votes
+        mongo.db.scenarios.update_one({'_id': scenario_id}, {'$inc': {'mulligan_votes': 2}})
+
+        scenario = buffer.scenario(scenario_id)
+        assert (scenario['keep_votes'], scenario['mulligan_votes']) == (1, 2)
+
+    def test_failed_flush_requeues(self, mongo, mocker):
+        """Test that increments whose write failed are written by the next flush."""
+        buffer = TallyBuffer(mongo.db, VOTE_TALLY_PROJECTION, interval_ms=60000)
+        scenario_id = insert_scenario(mongo)
+        buffer.add(buffer.scenario(scenario_id), {'keep_votes': 1})
+
+        bulk_write = mocker.patch.object(buffer.db.scenarios, 'bulk_write', side_effect=ConnectionError)
+        with pytest.raises(ConnectionError):
+            buffer.flush()
+        mocker.stop(bulk_write)
+        buffer.add(buffer.scenario(scenario_id), {'keep_votes': 1})
+
+        assert buffer.flush() == 1
+        assert mongo.db.scenarios.find_one({'_id': scenario_id})['keep_votes'] == 2
+        assert mongo.db.mulligan_stats.find_one({'scope': 'hand'})['keep_votes'] == 2
+
+    def test_failed_stats_retried(self, mongo, mocker):
+        """Test that a failed statistics write is retried without counting the tally twice."""
+        buffer = TallyBuffer(mongo.db, VOTE_TALLY_PROJECTION, interval_ms=60000)
+        scenario_id = insert_scenario(mongo)
+        buffer.add(buffer.scenario(scenario_id), {'keep_votes': 1})
+
+        bulk_write = mocker.patch.object(buffer.db.mulligan_stats, 'bulk_write', side_effect=ConnectionError)
+        with pytest.raises(ConnectionError):
+            buffer.flush()
+        mocker.stop(bulk_write)
+
+        assert buffer.flush() == 0
+        assert mongo.db.scenarios.find_one({'_id': scenario_id})['keep_votes'] == 1
+        assert mongo.db.mulligan_stats.find_one({'scope': 'hand'})['keep_votes'] == 1
+
+class TestReconcileTallies:
+    def test_reconcile_from_votes(self, mongo):
+        """Test that tallies are recomputed from the votes collection."""
+        scenario_id = insert_scenario(mongo, keep_votes=5)
+        empty_id = insert_scenario(mongo, mulligan_votes=2)
+        mongo.db.votes.insert_many([
+            {'scenario_id': scenario_id, 'user_id': ObjectId(), 'decision': 'keep', 'created_at': datetime.utcnow()},
+            {'scenario_id': scenario_id, 'user_id': ObjectId(), 'decision': 'mulligan', 'created_at': datetime.utcnow()}
+        ])
+
+        assert reconcile_tallies(mongo.db) == 2
+
+        stored = mongo.db.scenarios.find_one({'_id': scenario_id})
+        assert (stored['keep_votes'], stored['mulligan_votes']) == (1, 1)
+        assert mongo.db.scenarios.find_one({'_id': empty_id})['mulligan_votes'] == 0
+
+    def test_reconcile_since(self, mongo):
+        """Test that since limits reconciliation to recently voted scenarios."""
+        old_id = insert_scenario(mongo, keep_votes=9)
+        new_id = insert_scenario(mongo, keep_votes=9)
+        now = datetime.utcnow()
+        mongo.db.votes.insert_many([
+            {'scenario_id': old_id, 'user_id': ObjectId(), 'decision': 'keep', 'created_at': now - timedelta(days=1)},
+            {'scenario_id': new_id, 'user_id': ObjectId(), 'decision': 'keep', 'created_at': now}
+        ])
+
+        assert reconcile_tallies(mongo.db, since=now - timedelta(minutes=5)) == 1
+
+        assert mongo.db.scenarios.find_one({'_id': old_id})['keep_votes'] == 9
+        assert mongo.db.scenarios.find_one({'_id': new_id})['keep_votes'] == 1
+
+class TestBufferedVoteAPI:
+    @pytest.fixture(autouse=True)
+    def buffered_mode(self, monkeypatch):
+        """Create the app in buffered tally mode, flushing only when told to."""
+        monkeypatch.setattr(DevelopmentConfig, 'VOTE_TALLY_MODE', 'buffered')
+        monkeypatch.setattr(DevelopmentConfig, 'VOTE_FLUSH_INTERVAL_MS', 60000)
+
+    def test_buffered_votes(self, client, mongo, auth_headers):
+        """Test that votes are stored at once and tallies after a flush."""
+        decklist_id = client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Modern', 'cards': [{'name': 'Mountain', 'quantity': 60}]}),
+            headers=auth_headers
+        ).get_json()['decklist']['_id']
+        scenario_id = client.post(
+            '/api/scenarios',
+            data=json.dumps({'decklist_id': decklist_id, 'opponent_archetype': 'Aggro', 'game_number': 1}),
+            headers=auth_headers
+        ).get_json()['scenario']['_id']
+
+        response = client.post('/api/votes', data=json.dumps({'scenario_id': scenario_id, 'decision': 'keep'}), headers=auth_headers)
+
+        assert response.status_code == 201
+        assert response.get_json()['keep_votes'] == 1
+        assert mongo.db.votes.count_documents({}) == 1
+        assert mongo.db.scenarios.find_one({'_id': ObjectId(scenario_id)})['keep_votes'] == 0
+
+        client.application.extensions['tally_buffer'].flush()
+
+        assert mongo.db.scenarios.find_one({'_id': ObjectId(scenario_id)})['keep_votes'] == 1
+
+    def test_buffered_vote_missing_scenario(self, client, mongo, auth_headers):
+        """Test that a vote on a missing scenario is still rejected."""
+        response = client.post('/api/votes', data=json.dumps({'scenario_id': str(ObjectId()), 'decision': 'keep'}), headers=auth_headers)
+
+        assert response.status_code == 404
+        assert mongo.db.votes.count_documents({}) == 0
@@ -0,0 +1,146 @@
+import pytest
+import json
+import random
+from bson import ObjectId
+import training
+from catalog import CardCatalog
+from deck import hand_signature
+from training import NEXT_BATCH_SIZE, NEXT_MAX_BATCHES, WalkLimitReached, backfill_scenarios, backfill_signatures, next_unvoted
+
+def insert_scenarios(mongo, count, **fields):
+    documents = [
+        dict({'_id': ObjectId(), 'random_key': random.random(), 'num_cards': 7, 'hand': []}, **fields)
+        for _ in range(count)
+    ]
+    mongo.db.scenarios.insert_many(documents)
+    return [document['_id'] for document in documents]
+
+class TestNextUnvoted:
+    def test_skips_voted_scenarios(self, mongo):
+        """Test that the walk returns the only scenario left unvoted."""
+        user_id = ObjectId()
+        scenario_ids = insert_scenarios(mongo, 2 * NEXT_BATCH_SIZE)
+        mongo.db.votes.insert_many([
+            {'user_id': user_id, 'scenario_id': scenario_id, 'decision': 'keep'}
+            for scenario_id in scenario_ids[1:]
+        ])
+
+        for seed in range(5):
+            scenario = next_unvoted(mongo.db, user_id, rng=random.Random(seed))
+            assert scenario['_id'] == scenario_ids[0]
+
+    def test_none_when_all_voted(self, mongo):
+        """Test that a user who voted on everything gets None."""
+        user_id = ObjectId()
+        scenario_ids = insert_scenarios(mongo, 3)
+        mongo.db.votes.insert_many([
+            {'user_id': user_id, 'scenario_id': scenario_id, 'decision': 'keep'}
+            for scenario_id in scenario_ids
+        ])
+
+        assert next_unvoted(mongo.db, user_id) is None
+
+    def test_gives_up_after_batch_limit(self, mongo):
+        """Test that a walk stopping with candidates unread is told apart from None."""
+        user_id = ObjectId()
+        scenario_ids = insert_scenarios(mongo, NEXT_BATCH_SIZE * (NEXT_MAX_BATCHES + 1))
+        mongo.db.votes.insert_many([
+            {'user_id': user_id, 'scenario_id': scenario_id, 'decision': 'keep'}
+            for scenario_id in scenario_ids
+        ])
+
+        with pytest.raises(WalkLimitReached):
+            next_unvoted(mongo.db, user_id)
+
+    def test_filters(self, mongo):
+        """Test that filters restrict the candidates."""
+        insert_scenarios(mongo, 5, num_cards=7)
+        [six_card] = insert_scenarios(mongo, 1, num_cards=6)
+
+        scenario = next_unvoted(mongo.db, ObjectId(), {'num_cards': 6})
+
+        assert scenario['_id'] == six_card
+
+    def test_backfill_scenarios(self, mongo):
+        """Test that old scenarios get a random key and their decklist's format."""
+        decklist_id = mongo.db.decklists.insert_one({'format': 'Legacy'}).inserted_id
+        scenario_id = mongo.db.scenarios.insert_one({'decklist_id': decklist_id}).inserted_id
+
+        assert backfill_scenarios(mongo.db) == 1
+
+        scenario = mongo.db.scenarios.find_one({'_id': scenario_id})
+        assert 0 <= scenario['random_key'] < 1
+        assert scenario['format'] == 'Legacy'
+        assert backfill_scenarios(mongo.db) == 0
+
+    def test_backfill_scenarios_in_chunks(self, mongo, monkeypatch):
+        """Test that backfills write in chunks and a rerun skips finished scenarios."""
+        monkeypatch.setattr(training, 'BACKFILL_CHUNK_SIZE', 2)
+        mongo.db.scenarios.insert_many([{'decklist_id': None} for _ in range(5)])
+        bulk_write = mongo.db.scenarios.bulk_write
+        calls = []
+        monkeypatch.setattr(mongo.db.scenarios, 'bulk_write', lambda updates, **kwargs: calls.append(len(updates)) or bulk_write(updates, **kwargs))
+
+        assert backfill_scenarios(mongo.db) == 5
+        assert calls == [2, 2, 1]
+        assert backfill_scenarios(mongo.db) == 0
+
+    def test_backfill_signatures(self, mongo, monkeypatch):
+        """Test that old hands are signed in chunks and a rerun skips them."""
+        monkeypatch.setattr(training, 'BACKFILL_CHUNK_SIZE', 2)
+        hand = ['Mountain'] * 7
+        mongo.db.scenarios.insert_many([
+            {'hand': hand, 'on_play': True, 'num_cards': 7, 'game_number': 1, 'opponent_archetype': 'Aggro'}
+            for _ in range(3)
+        ])
+
+        assert backfill_signatures(mongo.db, CardCatalog(mongo.db)) == 3
+
+        assert mongo.db.scenarios.distinct('hand_signature') == [hand_signature(hand, True, 7, 1, 'Aggro')]
+        assert backfill_signatures(mongo.db, CardCatalog(mongo.db)) == 0
+
+class TestNextScenarioAPI:
+    @pytest.fixture
+    def decklist_id(self, client, mongo, auth_headers):
+        response = client.post(
+            '/api/decklists',
+            data=json.dumps({'name': 'Deck', 'format': 'Pioneer', 'cards': [{'name': 'Mountain', 'quantity': 60}]}),
+            headers=auth_headers
+        )
+        return response.get_json()['decklist']['_id']
+
+    def test_next_scenario(self, client, mongo, auth_headers, decklist_id):
+        """Test that /next serves unvoted scenarios until none are left."""
+        client.post(
+            '/api/scenarios/batch',
+            data=json.dumps({'decklist_id': decklist_id, 'count': 2, 'distribution': {'opponent_archetype': 'Aggro'}}),
+            headers=auth_headers
+        )
+
+        seen = set()
+        for _ in range(2):
+            response = client.get('/api/scenarios/next?format=Pioneer', headers=auth_headers)
+            assert response.status_code == 200
+            scenario = response.get_json()['scenario']
+            assert scenario['hand'] == ['Mountain'] * 7
+            assert 'random_key' not in scenario
+            seen.add(scenario['_id'])
+            client.post('/api/votes', data=json.dumps({'scenario_id': scenario['_id'], 'decision': 'keep'}), headers=auth_headers)
+
+        assert len(seen) == 2
+        assert client.get('/api/scenarios/next', headers=auth_headers).status_code == 404
+
+    def test_next_scenario_filters(self, client, mongo, auth_headers):
+        """Test that /next validates filters and requires a token."""
+        assert client.get('/api/scenarios/next').status_code == 401
+        assert client.get('/api/scenarios/next?num_cards=x', headers=auth_headers).status_code == 400
+        assert client.get('/api/scenarios/next?format=Vintage', headers=auth_headers).status_code == 404
+
+    def test_next_scenario_gave_up(self, client, mongo, auth_headers, mocker):
+        """Test that a walk that gave up asks the client to try again."""
+        mocker.patch('routes.scenario_routes.next_unvoted', side_effect=WalkLimitReached)
+
+        response = client.get('/api/scenarios/next', headers=auth_headers)
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,139 @@
+import random
+from pymongo import UpdateOne
+from deck import hand_signature
+
+# Candidates read per query, and how many batches to try before giving up
+NEXT_BATCH_SIZE = 50
+NEXT_MAX_BATCHES = 4
+
+# Updates per bulk_write in the backfills
+BACKFILL_CHUNK_SIZE = 1000
+
+class WalkLimitReached(Exception):
+    """Raised when next_unvoted stops after NEXT_MAX_BATCHES batches with
+    candidates still unread, so an unvoted scenario may yet exist."""
+
+def next_unvoted(db, user_id, filters=None, rng=random):
+    """Pick a random scenario the user has not voted on.
+
+    Every scenario carries a random_key drawn uniformly from [0, 1) when it
+    is created. Starting at a random point, candidates are read in
+    random_key order a batch at a time and anti-joined against the user's
+    votes with one $in query per batch, wrapping around to the start of the
+    key range once. Cost is bounded by NEXT_MAX_BATCHES batches however many
+    votes the user has cast. Each filter has a compound index ending in
+    random_key, so a batch is a range scan even for rare filter values.
+
+    Args:
+        db: PyMongo database
+        user_id: Voter's ObjectId
+        filters: Scenario field equality filters (decklist_id, format, num_cards)
+        rng: Source of the starting point
+
+    Returns:
+        The scenario document, or None when every candidate was voted on
+
+    Raises:
+        WalkLimitReached: The batch limit was hit before every candidate
+            was read; a later call starts elsewhere and may succeed
+    """
+    filters = filters or {}
+    start = rng.random()
+    batches = 0
+
+    # [start, 1) first, then wrap around to [0, start)
+    for lower, upper in ((start, None), (None, start)):
+        key_range = {'$gte': lower} if lower is not None else {}
+        while True:
+            if batches == NEXT_MAX_BATCHES:
+                raise WalkLimitReached()
+            batches += 1
+            if upper is not None:
+                key_range['$lt'] = upper
+            candidates = list(db.scenarios.find(
+                dict(filters, random_key=key_range)
+            ).sort('random_key', 1).limit(NEXT_BATCH_SIZE))
+
+            if not candidates:
+                break
+
+            voted = {
+                vote['scenario_id'] for vote in db.votes.find(
+                    {'user_id': user_id, 'scenario_id': {'$in': [candidate['_id'] for candidate in candidates]}},
+                    {'_id': 0, 'scenario_id': 1}
+                )
+            }
+            for candidate in candidates:
+                if candidate['_id'] not in voted:
+                    return candidate
+
+            if len(candidates) < NEXT_BATCH_SIZE:
+                break
+            key_range = {'$gt': candidates[-1]['random_key']}
+
+    return None
+
+def backfill_signatures(db, catalog):
+    """Compute hand_signature for scenarios created before signatures.
+
+    Like backfill_scenarios it writes in chunks and resumes on a rerun.
+
+    Returns:
+        Number of scenarios updated
+    """
+    return write_chunked(db.scenarios, _signature_backfills(db, catalog))
+
+def _signature_backfills(db, catalog):
+    fields = {'hand': 1, 'on_play': 1, 'num_cards': 1, 'game_number': 1, 'opponent_archetype': 1}
+    for scenario in db.scenarios.find({'hand_signature': {'$exists': False}}, fields):
+        signature = hand_signature(
+            catalog.decode(scenario.get('hand', [])),
+            scenario.get('on_play'),
+            scenario.get('num_cards'),
+            scenario.get('game_number'),
+            scenario.get('opponent_archetype')
+        )
+        yield UpdateOne({'_id': scenario['_id']}, {'$set': {'hand_signature': signature}})
+
+def write_chunked(collection, updates):
+    """Consume (possibly lazy) updates, writing BACKFILL_CHUNK_SIZE per bulk_write.
+
+    Returns:
+        Number of updates written
+    """
+    written = 0
+    chunk = []
+    for update in updates:
+        chunk.append(update)
+        if len(chunk) == BACKFILL_CHUNK_SIZE:
+            collection.bulk_write(chunk, ordered=False)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        collection.bulk_write(chunk, ordered=False)
+        written += len(chunk)
+    return written
+
+def backfill_scenarios(db):
+    """Give scenarios created before the next-scenario queue a random_key
+    and their decklist's format.
+
+    Writes go out in chunks and only scenarios still missing a random_key
+    are read, so a rerun after a failure resumes where it stopped.
+
+    Returns:
+        Number of scenarios updated
+    """
+    return write_chunked(db.scenarios, _scenario_backfills(db))
+
+def _scenario_backfills(db):
+    formats = {}
+    for scenario in db.scenarios.find({'random_key': {'$exists': False}}, {'decklist_id': 1}):
+        decklist_id = scenario.get('decklist_id')
+        if decklist_id not in formats:
+            decklist = db.decklists.find_one({'_id': decklist_id}, {'format': 1})
+            formats[decklist_id] = decklist.get('format') if decklist else None
+        yield UpdateOne(
+            {'_id': scenario['_id']},
+            {'$set': {'random_key': random.random(), 'format': formats[decklist_id]}}
+        )
@@ -47,10 +47,13 @@ export default {
       return apiClient.get('/scenarios', { params: { page, per_page: perPage } })
     },
     getById(id) {
-      return apiClient.get(`/scenarios/${id}`)
+      return apiClient.get(`/scenarios/${id}`, { params: { include: 'decklist_summary' } })
     },
     create(scenario) {
       return apiClient.post('/scenarios', scenario)
+    },
+    next(filters = {}) {
+      return apiClient.get('/scenarios/next', { params: filters })
     }
   },
 
@@ -60,6 +63,9 @@ export default {
     },
     getUserVote(scenarioId) {
       return apiClient.get(`/votes/scenario/${scenarioId}`)
+    },
+    lookup(scenarioIds) {
+      return apiClient.post('/votes/lookup', { scenario_ids: scenarioIds })
     }
   }
 }
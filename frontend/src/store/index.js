@@ -94,10 +94,13 @@ export const useScenarioStore = defineStore('scenario', {
     },
 
     async vote(scenarioId, decision) {
-      await api.votes.create(scenarioId, decision)
+      // The vote response carries the updated tallies, so no re-fetch
+      const response = await api.votes.create(scenarioId, decision)
+      const { keep_votes, mulligan_votes } = response.data
       if (this.currentScenario && this.currentScenario._id === scenarioId) {
-        await this.fetchScenario(scenarioId)
+        this.currentScenario = { ...this.currentScenario, keep_votes, mulligan_votes }
       }
+      return response.data
     },
 
     async getUserVote(scenarioId) {
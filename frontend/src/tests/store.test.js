@@ -140,17 +140,19 @@ describe('Scenario Store', () => {
   })
 
   it('creates a vote on a scenario', async () => {
-    api.votes.create.mockResolvedValue({ data: {} })
-    api.scenarios.getById.mockResolvedValue({
-      data: { scenario: { _id: '1', keep_votes: 1 } }
+    api.votes.create.mockResolvedValue({
+      data: { scenario_id: '1', decision: 'keep', keep_votes: 1, mulligan_votes: 0 }
     })
 
     const store = useScenarioStore()
-    store.currentScenario = { _id: '1', keep_votes: 0 }
+    store.currentScenario = { _id: '1', keep_votes: 0, mulligan_votes: 0, hand: ['Mountain'] }
 
-    await store.vote('1', 'keep')
+    const result = await store.vote('1', 'keep')
 
     expect(api.votes.create).toHaveBeenCalledWith('1', 'keep')
+    expect(api.scenarios.getById).not.toHaveBeenCalled()
+    expect(store.currentScenario).toEqual({ _id: '1', keep_votes: 1, mulligan_votes: 0, hand: ['Mountain'] })
+    expect(result.decision).toBe('keep')
   })
 
   it('gets user vote for a scenario', async () => {